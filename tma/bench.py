@@ -0,0 +1,610 @@
+"""
+Created on 18 Oct 2026
+
+Benchmark suite for the library domain classes (q2 and q3).
+
+A synthetic library of N items, M copies and K members is generated, and a
+mix of borrow, renew, return and pay operations is driven directly against
+`Member` and `Library`. The run reports operations per second, peak RSS and
+per-operation latency histograms, and can save the results as JSON:
+
+    python bench.py --ops 200000 --output before.json
+    python bench.py --ops 200000 --output after.json
+    python bench.py --compare before.json after.json
+
+A member's loan lookup by title can also be timed against a linear scan of
+a member with many loans:
+
+    python bench.py --member-loans 10000
+
+"""
+
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import policy
+from q2 import Book, ItemCopy, Loan, Media
+from q3 import JuniorMember, Library, LibraryException, Member
+
+
+OPERATIONS = ("borrow", "renew", "return", "pay")
+DEFAULT_MIX = {"borrow": 0.4, "renew": 0.2, "return": 0.3, "pay": 0.1}
+START_DATE = datetime(2021, 1, 1)
+
+
+class LatencyRecorder:
+    """A class to collect the latencies and outcomes of one operation type.
+
+    Example:
+        >>> recorder = LatencyRecorder()
+        >>> recorder.record(1500, True)
+
+    """
+
+    def __init__(self):
+        """The `__init__` method initialises three instance attributes."""
+
+        # :list: latency of every call in nanoseconds
+        self._latencies = []
+        self._succeeded = 0
+        self._failed = 0
+
+    def record(self, nanoseconds, succeeded):
+        """Record one call of the operation"""
+
+        self._latencies.append(nanoseconds)
+        if succeeded:
+            self._succeeded += 1
+        else:
+            self._failed += 1
+
+    def merge(self, other):
+        """Add the calls recorded by another LatencyRecorder"""
+
+        self._latencies.extend(other._latencies)
+        self._succeeded += other._succeeded
+        self._failed += other._failed
+
+    def summary(self):
+        """Summarise the recorded calls.
+
+        Returns:
+            summary (dict): Call counts, total seconds, p50/p90/p99/max
+                latency in microseconds, and a histogram of latencies in
+                power-of-two microsecond buckets ('<=1', '<=2', '<=4' ...).
+
+        """
+
+        latencies = sorted(self._latencies)
+        count = len(latencies)
+        summary = {
+            "calls": count,
+            "succeeded": self._succeeded,
+            "failed": self._failed,
+            "seconds": sum(latencies) / 1e9,
+        }
+        if not count:
+            return summary
+
+        for name, fraction in (("p50_us", 0.50), ("p90_us", 0.90), ("p99_us", 0.99)):
+            summary[name] = latencies[min(count - 1, int(fraction * count))] / 1000
+        summary["max_us"] = latencies[-1] / 1000
+
+        histogram = {}
+        for nanoseconds in latencies:
+            bucket = 1
+            while bucket * 1000 < nanoseconds:
+                bucket *= 2
+            histogram[f"<={bucket}"] = histogram.get(f"<={bucket}", 0) + 1
+        summary["histogram_us"] = histogram
+
+        return summary
+
+
+def build_library(items, copies, members, seed=162):
+    """Generate a synthetic library.
+
+    Half of the items are books and half are media, copies are spread evenly
+    over the items, and one in ten members is a junior member.
+
+    Returns:
+        library (Library): The generated library.
+        member_list (list): The registered members.
+
+    """
+
+    rng = random.Random(seed)
+    library = Library()
+
+    item_list = []
+    for index in range(items):
+        year = rng.randint(2000, 2021)
+        cost = rng.randint(10, 60)
+        if index % 2:
+            item = Book(f"Book {index}", year, cost, [f"Author {index % 997}"])
+        else:
+            item = Media(f"Media {index}", year, cost)
+        library.add_item(item)
+        item_list.append(item)
+
+    for index in range(copies):
+        library.add_copy_item(item_list[index % items])
+
+    member_list = []
+    for index in range(members):
+        member_type = JuniorMember if index % 10 == 0 else Member
+        member = member_type(f"M{index}", f"Member {index}")
+        library.register_member(member)
+        member_list.append(member)
+
+    return library, member_list
+
+
+def _pick_open_title(member, rng):
+    """Return the title of a random unreturned loan of `member`, if any"""
+
+    present_loans = member.present_loans()
+    if not present_loans:
+        return None
+    return rng.choice(present_loans).loan_title()
+
+
+def run_workload(library, members, ops, mix=None, seed=162, days=365):
+    """Drive a random mix of operations against the library.
+
+    Operation dates advance evenly from `START_DATE` over `days` days. A
+    call that raises LibraryException is recorded as failed. Borrows are of
+    copies drawn from the library's own copies.
+
+    Returns:
+        recorders (dict): A LatencyRecorder for each operation type.
+
+    """
+
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    recorders = {op: LatencyRecorder() for op in OPERATIONS}
+    choices = rng.choices(OPERATIONS, [mix[op] for op in OPERATIONS], k=ops)
+    # ids of the library's copies, which need not run from 1 to the last id
+    # given out in the process
+    copy_ids = list(library._copy_index)
+    clock = time.perf_counter_ns
+
+    for index, op in enumerate(choices):
+        member = rng.choice(members)
+        date = START_DATE + timedelta(days=days * index / ops)
+
+        if op == "borrow":
+            item_copy = library.search_copy_item(rng.choice(copy_ids))
+            if not item_copy:  # removed since the workload started
+                continue
+            start = clock()
+            try:
+                succeeded = member.borrow_item(item_copy, date)
+            except LibraryException:
+                succeeded = False
+        elif op in ("renew", "return"):
+            title = _pick_open_title(member, rng)
+            if title is None:
+                continue
+            start = clock()
+            try:
+                if op == "renew":
+                    succeeded = member.renew(title, date)
+                else:
+                    succeeded = member.return_item(title, date)
+            except LibraryException:
+                succeeded = False
+        else:
+            if not member.amount_owed:
+                continue
+            start = clock()
+            try:
+                member.pay(member.amount_owed, date)
+                succeeded = True
+            except LibraryException:
+                succeeded = False
+
+        recorders[op].record(clock() - start, succeeded)
+
+    return recorders
+
+
+def run_threaded(library, members, ops, threads, seed=162):
+    """Run the workload from a thread pool, members split between threads.
+
+    Every copy must end up either available or on exactly one unreturned
+    loan, otherwise a copy was lent twice.
+
+    Raises:
+        AssertionError: If a copy was lent to more than one member.
+
+    Returns:
+        recorders (dict): A merged LatencyRecorder for each operation type.
+
+    """
+
+    def run_share(index):
+        # Threads share copies but each thread drives its own members
+        return run_workload(
+            library, members[index::threads], ops // threads, seed=seed + index
+        )
+
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(run_share, range(threads)))
+
+    lent = [loan.copy_id() for member in members for loan in member.present_loans()]
+    assert len(lent) == len(set(lent)), "a copy was lent to more than one member"
+    available = {item_copy.copy_id for item_copy in library.get_available_copy_items()}
+    assert available.isdisjoint(lent), "a lent copy is listed as available"
+
+    merged = {op: LatencyRecorder() for op in OPERATIONS}
+    for recorders in results:
+        for op, recorder in recorders.items():
+            merged[op].merge(recorder)
+    return merged
+
+
+class _Unslotted:
+    """A class to hold the attributes of a slotted instance in a per-instance
+    `__dict__`, as instances of its class did before `__slots__`.
+
+    Example:
+        >>> _Unslotted(ItemCopy(book))
+
+    """
+
+    def __init__(self, instance):
+        """The `__init__` method copies the slot attributes of `instance`."""
+
+        for cls in type(instance).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(instance, name):
+                    setattr(self, name, getattr(instance, name))
+
+
+def measure_memory(count=1000000):
+    """Measure the bytes allocated per ItemCopy and per Loan instance, with
+    their `__slots__` and with their attributes in a `__dict__` instead.
+
+    Returns:
+        results (dict): Bytes per instance, 'item_copy_bytes' and
+            'loan_bytes' as the classes are, and 'item_copy_dict_bytes' and
+            'loan_dict_bytes' were their instances an object with a
+            `__dict__` in place of the slotted object.
+
+    """
+
+    book = Book("Memory", 2020, 10.00, ["Author"])
+    tracemalloc.start()
+    copies = [ItemCopy(book) for _ in range(count)]
+    after_copies = tracemalloc.get_traced_memory()[0]
+    loans = [Loan(item_copy, START_DATE) for item_copy in copies]
+    after_loans = tracemalloc.get_traced_memory()[0]
+    # the unslotted objects share the attribute values of the slotted ones,
+    # so only the objects and their `__dict__` are allocated
+    copy_dicts = [_Unslotted(item_copy) for item_copy in copies]
+    after_copy_dicts = tracemalloc.get_traced_memory()[0]
+    loan_dicts = [_Unslotted(loan) for loan in loans]
+    after_loan_dicts = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    item_copy_bytes = after_copies / count
+    loan_bytes = (after_loans - after_copies) / count
+    item_copy_dict_bytes = (
+        item_copy_bytes
+        - sys.getsizeof(copies[0])
+        + (after_copy_dicts - after_loans) / count
+    )
+    loan_dict_bytes = (
+        loan_bytes
+        - sys.getsizeof(loans[0])
+        + (after_loan_dicts - after_copy_dicts) / count
+    )
+    del copies, loans, copy_dicts, loan_dicts
+
+    return {
+        "count": count,
+        "item_copy_bytes": item_copy_bytes,
+        "loan_bytes": loan_bytes,
+        "item_copy_dict_bytes": item_copy_dict_bytes,
+        "loan_dict_bytes": loan_dict_bytes,
+    }
+
+
+def benchmark_author_index(books=1000000, authors=100000, queries=100, seed=162):
+    """Compare co-author queries through `Library.search_items_by_authors`
+    with a linear scan of every book's authors.
+
+    Returns:
+        results (dict): Milliseconds per query for the index and the scan,
+            and whether both returned the same books.
+
+    """
+
+    rng = random.Random(seed)
+    library = Library()
+    for index in range(books):
+        names = [f"Author {rng.randrange(authors)}" for _ in range(rng.randint(1, 3))]
+        library.add_item(Book(f"Book {index}", 2020, 10.00, names))
+
+    pairs = []
+    for _ in range(queries):
+        book = library.search_item(f"Book {rng.randrange(books)}")
+        pairs.append((book.authors[0], book.authors[-1]))
+
+    start = time.perf_counter()
+    indexed = [library.search_items_by_authors(*pair) for pair in pairs]
+    index_ms = (time.perf_counter() - start) * 1000 / queries
+
+    start = time.perf_counter()
+    scanned = []
+    for pair in pairs:
+        wanted = {name.casefold() for name in pair}
+        scanned.append(
+            [
+                item
+                for item in library._items.values()
+                if wanted <= {name.casefold() for name in item.authors}
+            ]
+        )
+    scan_ms = (time.perf_counter() - start) * 1000 / queries
+
+    return {
+        "books": books,
+        "index_ms_per_query": index_ms,
+        "scan_ms_per_query": scan_ms,
+        "match": indexed == scanned,
+    }
+
+
+def benchmark_member_lookup(loans=10000, queries=1000, seed=162):
+    """Compare `Member.search_loan_for` on a member with `loans` loans, half
+    of them returned, with a linear scan of the member's loans.
+
+    Returns:
+        results (dict): Microseconds per lookup through the member's title
+            index and through the scan, and whether both found the same
+            loans.
+
+    """
+
+    rng = random.Random(seed)
+    member = Member("M0", "Member 0")
+    # the quota is lifted while the member's loans are made
+    previous = policy.current()
+    policy.update({"members": {"Member": {"loan_quota": loans}}})
+    try:
+        for index in range(loans):
+            book = Book(f"Book {index % (loans // 2)}", 2020, 10.00, ["Author"])
+            member.borrow_item(ItemCopy(book), START_DATE)
+    finally:
+        policy.set_policy(previous)
+    for index in range(0, loans // 2, 2):
+        member.return_item(f"Book {index}", START_DATE + timedelta(days=7))
+
+    titles = [f"book {rng.randrange(loans // 2)}" for _ in range(queries)]
+
+    def scan(title):
+        # the lookup as it was before the title index
+        title = title.lower()
+        unreturned, returned = [], []
+        for loan in member.loans():
+            if loan.loan_title().lower() == title:
+                (returned if loan.return_date else unreturned).append(loan)
+        if unreturned:
+            return unreturned[0]
+        return returned[-1] if returned else None
+
+    start = time.perf_counter()
+    indexed = [member.search_loan_for(title) for title in titles]
+    index_us = (time.perf_counter() - start) * 1e6 / queries
+
+    start = time.perf_counter()
+    scanned = [scan(title) for title in titles]
+    scan_us = (time.perf_counter() - start) * 1e6 / queries
+
+    return {
+        "loans": loans,
+        "index_us_per_lookup": index_us,
+        "scan_us_per_lookup": scan_us,
+        "match": all(a is b for a, b in zip(indexed, scanned)),
+    }
+
+
+def peak_rss_kb():
+    """Return the peak resident set size of the process in KB, if known"""
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return peak // 1024 if platform.system() == "Darwin" else peak
+
+
+def git_commit():
+    """Return the current git commit hash, None outside a git checkout"""
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(items, copies, members, ops, threads=1, seed=162):
+    """Build a synthetic library, run the workload and collect the results.
+
+    Returns:
+        results (dict): Parameters, build time, overall and per-operation
+            throughput and latency, memory per instance and peak RSS.
+
+    """
+
+    start = time.perf_counter()
+    library, member_list = build_library(items, copies, members, seed)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if threads > 1:
+        recorders = run_threaded(library, member_list, ops, threads, seed)
+    else:
+        recorders = run_workload(library, member_list, ops, seed=seed)
+    elapsed = time.perf_counter() - start
+
+    operations = {op: recorder.summary() for op, recorder in recorders.items()}
+    total_calls = sum(summary["calls"] for summary in operations.values())
+    for summary in operations.values():
+        if summary["seconds"]:
+            summary["ops_per_second"] = summary["calls"] / summary["seconds"]
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "parameters": {
+            "items": items,
+            "copies": copies,
+            "members": members,
+            "ops": ops,
+            "threads": threads,
+            "seed": seed,
+        },
+        "build_seconds": build_seconds,
+        "elapsed_seconds": elapsed,
+        "ops_per_second": total_calls / elapsed if elapsed else None,
+        "operations": operations,
+        # read before measuring memory, which allocates a million instances
+        "peak_rss_kb": peak_rss_kb(),
+        "memory": measure_memory(),
+    }
+
+
+def format_results(results):
+    """Return a text report of `run_benchmark` results"""
+
+    memory = results["memory"]
+    lines = [
+        f"commit: {results['commit']}",
+        f"parameters: {results['parameters']}",
+        f"build: {results['build_seconds']:.2f}s  "
+        f"run: {results['elapsed_seconds']:.2f}s  "
+        f"throughput: {results['ops_per_second']:.0f} ops/sec",
+        f"peak RSS: {results['peak_rss_kb']} KB",
+        f"per instance with __slots__ (with __dict__): "
+        f"ItemCopy {memory['item_copy_bytes']:.0f} B "
+        f"({memory['item_copy_dict_bytes']:.0f} B)  "
+        f"Loan {memory['loan_bytes']:.0f} B ({memory['loan_dict_bytes']:.0f} B)",
+        f"{'op':<8}{'calls':>10}{'failed':>10}{'ops/sec':>12}"
+        f"{'p50 us':>10}{'p99 us':>10}{'max us':>10}",
+    ]
+    for op, summary in results["operations"].items():
+        if not summary["calls"]:
+            continue
+        lines.append(
+            f"{op:<8}{summary['calls']:>10}{summary['failed']:>10}"
+            f"{summary['ops_per_second']:>12.0f}{summary['p50_us']:>10.1f}"
+            f"{summary['p99_us']:>10.1f}{summary['max_us']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def compare_results(before, after):
+    """Return a text report of the change between two saved results"""
+
+    lines = [
+        f"before: {before['commit']}",
+        f"after:  {after['commit']}",
+        f"{'op':<8}{'ops/sec before':>16}{'after':>12}{'change':>10}"
+        f"{'p99 us before':>16}{'after':>10}",
+    ]
+    for op in OPERATIONS:
+        old = before["operations"].get(op, {})
+        new = after["operations"].get(op, {})
+        if not old.get("calls") or not new.get("calls"):
+            continue
+        change = new["ops_per_second"] / old["ops_per_second"] - 1
+        lines.append(
+            f"{op:<8}{old['ops_per_second']:>16.0f}{new['ops_per_second']:>12.0f}"
+            f"{change:>+10.1%}{old['p99_us']:>16.1f}{new['p99_us']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """Run the benchmark, or compare two saved results with --compare"""
+
+    parser = argparse.ArgumentParser(description="Library domain benchmark")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--copies", type=int, default=50000)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--ops", type=int, default=100000)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=162)
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument(
+        "--authors",
+        type=int,
+        metavar="BOOKS",
+        help="compare the author index with a linear scan over BOOKS books",
+    )
+    parser.add_argument(
+        "--member-loans",
+        type=int,
+        metavar="LOANS",
+        help="compare a member's loan index with a linear scan over LOANS loans",
+    )
+    args = parser.parse_args()
+
+    if args.member_loans:
+        results = benchmark_member_lookup(args.member_loans, seed=args.seed)
+        print(
+            f"{results['loans']} loans: "
+            f"index {results['index_us_per_lookup']:.2f}us/lookup, "
+            f"scan {results['scan_us_per_lookup']:.0f}us/lookup, "
+            f"same results: {results['match']}"
+        )
+        return
+
+    if args.authors:
+        results = benchmark_author_index(args.authors, queries=10, seed=args.seed)
+        print(
+            f"{results['books']} books: "
+            f"index {results['index_ms_per_query']:.3f}ms/query, "
+            f"scan {results['scan_ms_per_query']:.1f}ms/query, "
+            f"same results: {results['match']}"
+        )
+        return
+
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            print(compare_results(json.load(before), json.load(after)))
+        return
+
+    results = run_benchmark(
+        args.items, args.copies, args.members, args.ops, args.threads, args.seed
+    )
+    print(format_results(results))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
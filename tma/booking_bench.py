@@ -0,0 +1,351 @@
+"""
+Created on 18 Oct 2026
+
+Benchmarks for the staycation and booking classes of q1.
+
+A synthetic catalogue of staycations spread over hotels is generated, and
+the `StaycationCatalogue` is timed adding the listings, repricing some of
+them and answering cheapest and price range queries. Its answers are
+checked against a full sort of the listings:
+
+    python booking_bench.py --listings 300000
+
+Non-overlapping bookings of the hotels' staycations can also be generated,
+and the `BookingCalendar` and `BookingRegistry` timed over them, their
+answers being checked against scans of every booking:
+
+    python booking_bench.py --bookings 1000000
+
+"""
+
+
+import argparse
+import gc
+import random
+import time
+from datetime import datetime, timedelta
+
+from q1 import (
+    Booking,
+    BookingCalendar,
+    BookingRegistry,
+    Customer,
+    Staycation,
+    StaycationCatalogue,
+)
+
+START_DATE = datetime(2021, 1, 1)
+
+
+def synthetic_staycations(listings, hotels, seed=162):
+    """Generate `listings` staycations spread over `hotels` hotels.
+
+    Returns:
+        staycations (list): Staycations of 1 to 5 nights, costing 80 to 600
+            per night in whole dollars.
+
+    """
+
+    rng = random.Random(seed)
+    staycations = []
+    for index in range(listings):
+        nights = rng.randint(1, 5)
+        staycations.append(
+            Staycation(
+                f"Hotel {index % hotels}",
+                nights,
+                nights * rng.randint(80, 600),
+                rng.random() < 0.5,
+            )
+        )
+    return staycations
+
+
+def _by_price(staycations):
+    """Return (cost per night, id) of `staycations`, in ascending order, to
+    compare orderings whatever the order of ties
+    """
+
+    return sorted(
+        (staycation.cost_per_night(), id(staycation)) for staycation in staycations
+    )
+
+
+def benchmark_catalogue(listings=300000, hotels=2000, operations=1000, seed=162):
+    """Time a `StaycationCatalogue` of `listings` staycations.
+
+    The catalogue is filled, then `operations` staycations are repriced,
+    `operations` top-10 and price range queries are made, across all hotels
+    and per hotel, and `operations` staycations are removed.
+
+    Returns:
+        results (dict): Microseconds per add, reprice, query and remove,
+            and whether the catalogue's answers match a full sort.
+
+    """
+
+    rng = random.Random(seed)
+    staycations = synthetic_staycations(listings, hotels, seed)
+    catalogue = StaycationCatalogue()
+
+    start = time.perf_counter()
+    for staycation in staycations:
+        catalogue.add(staycation)
+    add_us = (time.perf_counter() - start) * 1e6 / listings
+
+    repriced = rng.sample(staycations, operations)
+    new_costs = [staycation.nights * rng.randint(80, 600) for staycation in repriced]
+    start = time.perf_counter()
+    for staycation, new_cost in zip(repriced, new_costs):
+        staycation.cost = new_cost
+    reprice_us = (time.perf_counter() - start) * 1e6 / operations
+
+    queries = []
+    for _ in range(operations):
+        hotel_name = f"Hotel {rng.randrange(hotels)}" if rng.random() < 0.5 else None
+        low = rng.randint(80, 600)
+        queries.append((hotel_name, low, low + rng.randint(0, 20)))
+    start = time.perf_counter()
+    answers = [
+        (
+            catalogue.cheapest(10, hotel_name),
+            catalogue.price_range(low, high, hotel_name, limit=10),
+        )
+        for hotel_name, low, high in queries
+    ]
+    query_us = (time.perf_counter() - start) * 1e6 / (2 * operations)
+
+    removed = rng.sample(staycations, operations)
+    start = time.perf_counter()
+    for staycation in removed:
+        catalogue.remove(staycation)
+    remove_us = (time.perf_counter() - start) * 1e6 / operations
+
+    # the answers are checked against sorts of the listings as they were
+    # queried, and the catalogue as a whole against the listings left
+    match = True
+    removed_ids = {id(staycation) for staycation in removed}
+    for (hotel_name, low, high), (cheapest, in_range) in zip(queries[:100], answers):
+        listed = [
+            staycation
+            for staycation in staycations
+            if hotel_name in (None, staycation.hotel_name)
+        ]
+        prices = sorted(staycation.cost_per_night() for staycation in listed)
+        match &= [staycation.cost_per_night() for staycation in cheapest] == prices[:10]
+        match &= [staycation.cost_per_night() for staycation in in_range] == [
+            price for price in prices if low <= price <= high
+        ][:10]
+    remaining = [
+        staycation for staycation in staycations if id(staycation) not in removed_ids
+    ]
+    match &= _by_price(catalogue.cheapest(len(catalogue))) == _by_price(remaining)
+
+    return {
+        "listings": listings,
+        "add_us": add_us,
+        "reprice_us": reprice_us,
+        "query_us": query_us,
+        "remove_us": remove_us,
+        "match": match,
+    }
+
+
+def synthetic_bookings(bookings, hotels, seed=162):
+    """Generate `bookings` bookings of the staycations of `hotels` hotels,
+    ten staycations per hotel, none overlapping another of its hotel.
+
+    Returns:
+        booking_list (list): Bookings, in random order.
+
+    """
+
+    rng = random.Random(seed)
+    staycations = synthetic_staycations(10 * hotels, hotels, seed)
+    customers = [
+        Customer(f"Customer {index}", f"9{index:07d}") for index in range(1000)
+    ]
+    # each hotel's next free day, bookings following one another with gaps
+    next_free = [START_DATE] * hotels
+    booking_list = []
+    for index in range(bookings):
+        hotel = index % hotels
+        staycation = staycations[hotel + hotels * rng.randrange(10)]
+        check_in = next_free[hotel] + timedelta(days=rng.randint(0, 2))
+        booking_list.append(Booking(rng.choice(customers), staycation, check_in))
+        next_free[hotel] = check_in + timedelta(days=staycation.nights)
+    rng.shuffle(booking_list)
+    return booking_list
+
+
+def benchmark_bookings(bookings=1000000, hotels=2000, operations=10000, seed=162):
+    """Time a `BookingCalendar` and a `BookingRegistry` of `bookings`
+    bookings.
+
+    The calendar is filled, then `operations` stays are checked for
+    availability, and the guests staying one night are listed; the registry
+    is filled, then the staycations of one hotel in ten are repriced.
+
+    Returns:
+        results (dict): Microseconds per calendar add, availability check
+            and registry add, milliseconds for the night's guests and for the
+            repricing, against scans of every booking, and whether the
+            calendar and registry answers match the scans.
+
+    """
+
+    rng = random.Random(seed)
+    booking_list = synthetic_bookings(bookings, hotels, seed)
+    calendar = BookingCalendar()
+    registry = BookingRegistry()
+
+    start = time.perf_counter()
+    for booking in booking_list:
+        calendar.add(booking)
+    calendar_add_us = (time.perf_counter() - start) * 1e6 / bookings
+
+    last_day = max(booking.check_out_date() for booking in booking_list)
+    span = (last_day - START_DATE).days
+    stays = [
+        (
+            f"Hotel {rng.randrange(hotels)}",
+            START_DATE + timedelta(days=rng.randrange(span)),
+            rng.randint(1, 5),
+        )
+        for _ in range(operations)
+    ]
+    start = time.perf_counter()
+    available = [calendar.is_available(*stay) for stay in stays]
+    probe_us = (time.perf_counter() - start) * 1e6 / operations
+
+    night = START_DATE + timedelta(days=span // 2)
+    start = time.perf_counter()
+    staying = calendar.staying_on(night)
+    staying_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for booking in booking_list:
+        registry.add(booking)
+    registry_add_us = (time.perf_counter() - start) * 1e6 / bookings
+
+    repriced_hotels = {
+        f"Hotel {index}" for index in rng.sample(range(hotels), max(1, hotels // 10))
+    }
+    staycations = {booking.staycation for booking in booking_list}
+    new_costs = {
+        staycation: staycation.cost + rng.randint(-50, 50)
+        for staycation in staycations
+        if staycation.hotel_name in repriced_hotels
+    }
+    start = time.perf_counter()
+    differences = registry.reprice(new_costs)
+    reprice_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    scanned_differences = [
+        (booking, booking.cost_difference_from_current())
+        for booking in booking_list
+        if booking.staycation in new_costs
+    ]
+    scan_reprice_ms = (time.perf_counter() - start) * 1000
+
+    # the calendar's answers against scans of the bookings of each hotel
+    by_hotel = {}
+    for booking in booking_list:
+        by_hotel.setdefault(booking.hotel_name(), []).append(booking)
+
+    def overlaps(hotel_name, check_in_date, nights):
+        check_out_date = check_in_date + timedelta(days=nights)
+        return any(
+            booking.check_in_date < check_out_date
+            and booking.check_out_date() > check_in_date
+            for booking in by_hotel[hotel_name]
+        )
+
+    start = time.perf_counter()
+    scanned_staying = [
+        booking
+        for booking in booking_list
+        if booking.check_in_date <= night < booking.check_out_date()
+    ]
+    scan_staying_ms = (time.perf_counter() - start) * 1000
+
+    match = all(
+        is_available != overlaps(*stay)
+        for stay, is_available in zip(stays[:1000], available)
+    )
+    match &= {id(booking) for booking in staying} == {
+        id(booking) for booking in scanned_staying
+    }
+    match &= sorted(
+        (id(booking), difference) for booking, difference in differences
+    ) == sorted((id(booking), difference) for booking, difference in scanned_differences)
+
+    return {
+        "bookings": bookings,
+        "calendar_add_us": calendar_add_us,
+        "probe_us": probe_us,
+        "staying_ms": staying_ms,
+        "scan_staying_ms": scan_staying_ms,
+        "registry_add_us": registry_add_us,
+        "repriced_bookings": len(differences),
+        "reprice_ms": reprice_ms,
+        "scan_reprice_ms": scan_reprice_ms,
+        "match": match,
+    }
+
+
+def main():
+    """Run the staycation catalogue benchmark, or the booking benchmark with
+    --bookings
+    """
+
+    parser = argparse.ArgumentParser(description="Staycation and booking benchmark")
+    parser.add_argument("--listings", type=int, default=300000)
+    parser.add_argument("--hotels", type=int, default=2000)
+    parser.add_argument("--operations", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=162)
+    parser.add_argument(
+        "--bookings",
+        type=int,
+        help="time the booking calendar and registry over BOOKINGS bookings",
+    )
+    args = parser.parse_args()
+
+    # without garbage collection, as in `timeit`: with millions of objects
+    # alive, full collections would land on whichever step is being timed
+    gc.disable()
+
+    if args.bookings:
+        results = benchmark_bookings(
+            args.bookings, args.hotels, args.operations, args.seed
+        )
+        print(
+            f"{results['bookings']} bookings: "
+            f"calendar add {results['calendar_add_us']:.1f}us, "
+            f"availability {results['probe_us']:.1f}us, "
+            f"staying on a night {results['staying_ms']:.1f}ms "
+            f"(scan {results['scan_staying_ms']:.0f}ms), "
+            f"registry add {results['registry_add_us']:.1f}us, "
+            f"reprice of {results['repriced_bookings']} bookings "
+            f"{results['reprice_ms']:.0f}ms "
+            f"(scan {results['scan_reprice_ms']:.0f}ms), "
+            f"same results: {results['match']}"
+        )
+        return
+
+    results = benchmark_catalogue(
+        args.listings, args.hotels, args.operations, args.seed
+    )
+    print(
+        f"{results['listings']} listings: "
+        f"add {results['add_us']:.1f}us, "
+        f"reprice {results['reprice_us']:.1f}us, "
+        f"query {results['query_us']:.1f}us, "
+        f"remove {results['remove_us']:.1f}us, "
+        f"same results: {results['match']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
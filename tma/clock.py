@@ -0,0 +1,125 @@
+"""
+Created on 18 Oct 2026
+
+Clock of the library, for the current date and year.
+
+The system clock caches the current year, so code computing charges for a
+whole catalogue does not read the system time once per item. The cached
+year is refreshed by `tick`, which long-running callers (the application
+menu, the server) call once per request. Tests and reports can install a
+`FixedClock` with `set_clock` instead.
+
+"""
+
+
+from datetime import datetime
+
+
+class SystemClock:
+    """A class to represent the system time, with a cached current year.
+
+    Example:
+        >>> clock = SystemClock()
+        >>> clock.year
+        2026
+
+    """
+
+    def __init__(self):
+        """The `__init__` method initialises one instance attribute."""
+
+        # :int: the current year as of the last tick, None until first used
+        self._year = None
+
+    @property
+    def year(self):
+        """The current year, as of the last tick.
+
+        :getter: Return the cached current year
+        :rtype: int
+
+        """
+
+        if self._year is None:
+            self.tick()
+        return self._year
+
+    def now(self):
+        """Return the current date and time"""
+
+        return datetime.now()
+
+    def tick(self):
+        """Refresh the cached current year from the system time"""
+
+        self._year = datetime.now().year
+
+
+class FixedClock:
+    """A class to represent a clock stopped at a given moment.
+
+    Example:
+        >>> clock = FixedClock(datetime(2021, 3, 1))
+        >>> clock.year
+        2021
+
+    """
+
+    def __init__(self, moment):
+        """The `__init__` method initialises one instance attribute.
+
+        Args:
+            moment (datetime): The date and time the clock shows.
+
+        """
+
+        self._moment = moment
+
+    @property
+    def year(self):
+        """The year of the clock's moment.
+
+        :getter: Return the year of the fixed moment
+        :rtype: int
+
+        """
+
+        return self._moment.year
+
+    def now(self):
+        """Return the clock's moment"""
+
+        return self._moment
+
+    def tick(self):
+        """Do nothing, a fixed clock does not advance"""
+
+
+# :SystemClock, FixedClock: the clock used by the library
+_clock = SystemClock()
+
+
+def current():
+    """Return the clock used by the library"""
+
+    return _clock
+
+
+def set_clock(clock):
+    """Make `clock` the clock used by the library, returning the previous one"""
+
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+def current_year():
+    """Return the current year of the clock used by the library"""
+
+    return _clock.year
+
+
+def tick():
+    """Refresh the cached current year of the clock used by the library"""
+
+    _clock.tick()
@@ -0,0 +1,486 @@
+"""
+Created on 18 Oct 2026
+
+Change feed of library events, for downstream systems such as notifications
+and analytics.
+
+A `ChangeFeed` attached to a Library publishes an event for every borrow,
+renewal, return and payment of its registered members, and for every member
+registered or removed, into a bounded ring buffer. Subscribers read the feed
+from their own cursor, in batches, with `Subscription.poll`.
+
+Publishing stays cheap on the members' hot path: an event is stored as a
+plain tuple under a sequence number drawn from an atomic counter, without a
+lock, and is only made into an `Event` when it is polled. A reader knows an
+event from the sequence number stored with it, so it never reads a slot
+being overwritten as the event it expects.
+
+A member's change is written into the ring by the listener the feed
+attaches to the Library, without going through `publish`, and with the
+member and loan themselves: their ids and title are only read when the
+event is polled.
+
+When the ring is full the oldest events are overwritten, and subscribers
+that had not read them count them as `missed`. With `block_timeout` set,
+publishers wait instead, up to `block_timeout` seconds, for the slowest
+subscriber to make room.
+
+    feed = ChangeFeed()
+    feed.attach(library)
+    subscription = feed.subscribe()
+    for event in subscription.poll(max_events=100):
+        print(event.kind, event.member_id, event.title)
+
+"""
+
+
+import argparse
+import gc
+import itertools
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+
+BORROW = "borrow"
+RENEW = "renew"
+RETURN = "return"
+PAY = "pay"
+REGISTER = "register"
+REMOVE = "remove"
+
+
+Event = namedtuple(
+    "Event", ("sequence", "kind", "member_id", "title", "copy_id", "date", "amount")
+)
+Event.__doc__ = """An event of the feed.
+
+Attributes:
+    sequence (int): Position of the event in the feed, from 0.
+    kind (str): `BORROW`, `RENEW`, `RETURN`, `PAY`, `REGISTER` or `REMOVE`.
+    member_id (str): Id of the member concerned.
+    title (str): Title of the item loaned, None for other events.
+    copy_id (int): Id of the copy loaned, None for other events.
+    date (datetime): Date of the operation, None for `REGISTER` and `REMOVE`.
+    amount (float): Fines incurred by a return or amount paid, else 0.0.
+
+"""
+
+
+# Marks the `copy_id` field of event tuples stored by `_member_changed`, which
+# hold the member and loan in place of the member id and title
+_CHANGE = object()
+
+
+def _make_event(event):
+    """Return the Event of an event tuple stored in the ring"""
+
+    if event[4] is not _CHANGE:
+        return Event._make(event)
+    sequence, kind, member, loan, _, date, amount = event
+    if loan is None:
+        return Event(sequence, kind, member.member_id, None, None, date, amount)
+    return Event(
+        sequence, kind, member.member_id, loan.loan_title(), loan.copy_id(), date, amount
+    )
+
+
+class ChangeFeed:
+    """A class to represent a bounded ring buffer of library events.
+
+    Example:
+        >>> feed = ChangeFeed(capacity=1024)
+        >>> feed.publish(PAY, 'S123', date=datetime(2021, 3, 1), amount=2.50)
+        0
+        >>> feed.subscribe(from_oldest=True).poll()
+        [Event(sequence=0, kind='pay', member_id='S123', ...)]
+
+    """
+
+    def __init__(self, capacity=65536, block_timeout=None):
+        """The `__init__` method initialises ten instance attributes.
+
+        Args:
+            capacity (int): Number of events retained, rounded up to a power
+                of two, default to [65536].
+            block_timeout (float): Seconds a publisher waits for the slowest
+                subscriber when the ring is full, default to [None] to
+                overwrite the oldest events without waiting.
+
+        """
+
+        capacity = 1 << max(0, capacity - 1).bit_length()
+        self._capacity = capacity
+        self._mask = capacity - 1
+        # :list: event tuples, the event of sequence n at index n & `_mask`
+        self._slots = [None] * capacity
+        # :count: next sequence number, drawn atomically by publishers
+        self._sequence = itertools.count()
+        # :int: sequence following the latest event published (approximate
+        # while publishers race, used for new subscribers and lag)
+        self._head = 0
+        self._block_timeout = block_timeout
+        # :set: Subscriptions reading the feed
+        self._subscriptions = set()
+        # :int: sequence below which every subscriber has read, refreshed
+        # when a publisher blocking on a full ring checks for room
+        self._floor = 0
+        # :Condition: signalled when a subscriber makes room or an event is
+        # published, waited on by blocked publishers and polling subscribers
+        self._condition = threading.Condition()
+        # :int: number of publishers and subscribers waiting on `_condition`
+        self._waiting = 0
+
+    def __len__(self):
+        """Return the number of events retained"""
+
+        return min(self._head, self._capacity)
+
+    @property
+    def capacity(self):
+        """Number of events the feed retains.
+
+        :getter: Return the ring size
+        :rtype: int
+
+        """
+
+        return self._capacity
+
+    @property
+    def head(self):
+        """Sequence number the next event will have.
+
+        :getter: Return the sequence following the latest event
+        :rtype: int
+
+        """
+
+        return self._head
+
+    def publish(self, kind, member_id, title=None, copy_id=None, date=None, amount=0.0):
+        """Add an event to the feed.
+
+        Returns:
+            sequence (int): The sequence number of the event.
+
+        """
+
+        sequence = next(self._sequence)
+        if self._block_timeout is not None and sequence - self._capacity >= self._floor:
+            self._wait_for_room(sequence)
+        self._slots[sequence & self._mask] = (
+            sequence,
+            kind,
+            member_id,
+            title,
+            copy_id,
+            date,
+            amount,
+        )
+        if sequence >= self._head:
+            self._head = sequence + 1
+        if self._waiting:
+            with self._condition:
+                self._condition.notify_all()
+        return sequence
+
+    def _wait_for_room(self, sequence):
+        """Wait until every subscriber has read past the event `sequence`
+        overwrites, or `block_timeout` seconds have passed.
+        """
+
+        deadline = time.monotonic() + self._block_timeout
+        with self._condition:
+            # counted as waiting before checking, so no read goes unsignalled
+            self._waiting += 1
+            try:
+                while True:
+                    self._floor = min(
+                        (subscription.position for subscription in self._subscriptions),
+                        default=sequence + 1,
+                    )
+                    remaining = deadline - time.monotonic()
+                    if sequence - self._capacity < self._floor or remaining <= 0:
+                        return
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def subscribe(self, from_oldest=False):
+        """Return a Subscription reading the events published from now on,
+        or from the oldest event retained if `from_oldest`.
+        """
+
+        position = max(0, self._head - self._capacity) if from_oldest else self._head
+        subscription = Subscription(self, position)
+        with self._condition:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop `subscription` from holding back blocked publishers"""
+
+        with self._condition:
+            self._subscriptions.discard(subscription)
+            self._condition.notify_all()
+
+    def _read(self, position, max_events):
+        """Read up to `max_events` events from `position`.
+
+        Returns:
+            (tuple): The event tuples read, the position following them, and
+                the number of events overwritten before they could be read.
+
+        """
+
+        slots, mask, capacity = self._slots, self._mask, self._capacity
+        events = []
+        missed = 0
+        while len(events) < max_events:
+            slot = slots[position & mask]
+            if slot is None or slot[0] < position:
+                break  # not published yet
+            if slot[0] > position:
+                # overwritten: skip to the oldest event the ring may still hold
+                oldest = slot[0] - capacity + 1
+                missed += oldest - position
+                position = oldest
+                continue
+            events.append(slot)
+            position += 1
+        return events, position, missed
+
+    def _wait_for_events(self, position, timeout):
+        """Wait until the event `position` may have been published, or
+        `timeout` seconds have passed.
+        """
+
+        with self._condition:
+            # counted as waiting before checking, so no publish goes unsignalled
+            self._waiting += 1
+            try:
+                if self._head <= position:
+                    self._condition.wait(timeout)
+            finally:
+                self._waiting -= 1
+
+    def _advanced(self):
+        """Wake publishers blocked on a full ring after a subscriber read"""
+
+        if self._waiting:
+            with self._condition:
+                self._condition.notify_all()
+
+    def _member_changed(self, member, event, loan, date, amount):
+        """Library change listener writing the change into the ring.
+
+        This is `publish` inlined, saving a call on every member operation,
+        and the member and loan are stored as they are: their ids and title
+        are only read when the event is polled.
+        """
+
+        sequence = next(self._sequence)
+        if self._block_timeout is not None and sequence - self._capacity >= self._floor:
+            self._wait_for_room(sequence)
+        self._slots[sequence & self._mask] = (
+            sequence,
+            event,
+            member,
+            loan,
+            _CHANGE,
+            date,
+            amount,
+        )
+        if sequence >= self._head:
+            self._head = sequence + 1
+        if self._waiting:
+            with self._condition:
+                self._condition.notify_all()
+
+    def attach(self, library):
+        """Publish the changes of `library` and of its registered members"""
+
+        library.add_change_listener(self._member_changed)
+
+    def detach(self, library):
+        """Stop publishing the changes of `library`"""
+
+        library.remove_change_listener(self._member_changed)
+
+
+class Subscription:
+    """A class to represent a subscriber's cursor on a ChangeFeed.
+
+    Example:
+        >>> subscription = feed.subscribe()
+        >>> events = subscription.poll(max_events=100, timeout=1.0)
+
+    """
+
+    def __init__(self, feed, position):
+        """The `__init__` method initialises three instance attributes.
+
+        Args:
+            feed (ChangeFeed): The feed read.
+            position (int): Sequence number of the next event to read.
+
+        """
+
+        self._feed = feed
+        self._position = position
+        # :int: number of events overwritten before they could be read
+        self._missed = 0
+
+    @property
+    def position(self):
+        """Cursor of the subscription.
+
+        :getter: Return the sequence number of the next event to read
+        :rtype: int
+
+        """
+
+        return self._position
+
+    @property
+    def missed(self):
+        """Events the subscription fell too far behind to read.
+
+        :getter: Return the number of events overwritten before being read
+        :rtype: int
+
+        """
+
+        return self._missed
+
+    @property
+    def lag(self):
+        """Events published and not yet read.
+
+        :getter: Return the number of events behind the feed's head
+        :rtype: int
+
+        """
+
+        return max(0, self._feed.head - self._position)
+
+    def poll(self, max_events=256, timeout=0):
+        """Read the next batch of events.
+
+        Args:
+            max_events (int): Largest number of events returned, default to
+                [256].
+            timeout (float): Seconds to wait for an event if none is ready,
+                default to [0] not to wait, None to wait indefinitely.
+
+        Returns:
+            events (list): The Events read, in sequence order.
+
+        """
+
+        feed = self._feed
+        events, position, missed = feed._read(self._position, max_events)
+        if not events and timeout != 0:
+            feed._wait_for_events(self._position, timeout)
+            events, position, missed = feed._read(self._position, max_events)
+
+        self._position = position
+        self._missed += missed
+        if events:
+            feed._advanced()
+        return [_make_event(event) for event in events]
+
+    def close(self):
+        """Unsubscribe from the feed"""
+
+        self._feed.unsubscribe(self)
+
+
+def main():
+    """Time publishing and polling, and the feed's overhead on member
+    borrows, returns and payments
+    """
+
+    # imported here, the feed itself does not depend on the library classes
+    from q2 import Book
+    from q3 import Library, Member
+
+    parser = argparse.ArgumentParser(description="Change feed overhead")
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--members", type=int, default=10000)
+    parser.add_argument("--slice", type=int, default=100)
+    args = parser.parse_args()
+
+    feed = ChangeFeed()
+    date = datetime(2021, 3, 1)
+    start = time.perf_counter()
+    for index in range(args.events):
+        feed.publish(BORROW, "S123", "Title", index, date)
+    elapsed = time.perf_counter() - start
+    print(f"publish: {elapsed / args.events * 1e9:.0f} ns/event")
+
+    subscription = feed.subscribe(from_oldest=True)
+    start = time.perf_counter()
+    read = 0
+    while True:
+        events = subscription.poll(max_events=1024)
+        if not events:
+            break
+        read += len(events)
+    elapsed = time.perf_counter() - start
+    print(
+        f"poll: {elapsed / read * 1e9:.0f} ns/event, {read} read, "
+        f"{subscription.missed} missed"
+    )
+
+    # two identical libraries, the feed attached to the second, driven in
+    # alternating slices of members so that machine noise falls on both alike
+    runs = []
+    for attached in (False, True):
+        library = Library()
+        members = []
+        for index in range(args.members):
+            book = Book(f"Title {index}", 2020, 10.00, ["Author"])
+            library.add_item(book)
+            library.add_copy_item(book)
+            members.append(Member(f"S{index}", "Reader"))
+            library.register_member(members[-1])
+        if attached:
+            ChangeFeed().attach(library)
+        runs.append(list(zip(members, library.get_available_copy_items())))
+
+    late = date + timedelta(days=60)
+    operations = (
+        lambda member, item_copy: member.borrow_item(item_copy, date),
+        lambda member, item_copy: member.return_item(item_copy.item.title, late),
+        lambda member, item_copy: member.pay(100.00, late),  # the fines of the return
+    )
+    elapsed = [0.0, 0.0]
+    # without garbage collection while timing, as in `timeit`, so that a
+    # collection of both libraries' objects does not land on either's slice
+    gc.disable()
+    try:
+        for operation in operations:
+            for start in range(0, args.members, args.slice):
+                order = (0, 1) if start // args.slice % 2 else (1, 0)
+                for run in order:
+                    pairs = runs[run][start:start + args.slice]
+                    begin = time.perf_counter()
+                    for member, item_copy in pairs:
+                        operation(member, item_copy)
+                    elapsed[run] += time.perf_counter() - begin
+    finally:
+        gc.enable()
+
+    without_feed, with_feed = (run_elapsed / (3 * args.members) for run_elapsed in elapsed)
+    print(
+        f"borrow, return or pay: {without_feed * 1e9:.0f} ns without feed, "
+        f"{with_feed * 1e9:.0f} ns with feed, "
+        f"{(with_feed - without_feed) * 1e9:.0f} ns added per change"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Created on 18 Oct 2026
+
+Append-only ledgers of the fines and payments of library members.
+
+Amounts are held as integer cents, so that balances do not drift however
+many fines and payments are accumulated. Each entry also stores the running
+balance after it, a prefix sum over the entries in date order, so the
+current balance is read in O(1) and the balance as of any date is found by
+bisection in O(log n).
+
+"""
+
+
+import math
+from bisect import bisect_right
+from decimal import ROUND_HALF_UP, Decimal
+
+
+FINE = "fine"
+PAYMENT = "payment"
+
+
+def to_cents(amount):
+    """Convert a dollar amount to integer cents, rounding half cents up
+
+    Raises:
+        ValueError: If the amount is infinite or NaN.
+
+    """
+
+    if not math.isfinite(amount):
+        raise ValueError(f"Amount {amount} is not a finite number")
+    cents = Decimal(str(amount)) * 100
+    return int(cents.to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def to_dollars(cents):
+    """Convert integer cents to a dollar amount"""
+
+    return cents / 100
+
+
+class Ledger:
+    """A class to represent the fines and payments ledger of a member.
+
+    Entries are never modified or removed once recorded. They are kept in
+    order of date, an entry dated before the latest one being inserted in
+    place.
+
+    Example:
+        >>> ledger = Ledger()
+        >>> ledger.record(datetime(2021, 3, 20), 125, FINE)
+        >>> ledger.record(datetime(2021, 3, 21), -100, PAYMENT)
+        >>> ledger.balance
+        25
+        >>> ledger.balance_as_of(datetime(2021, 3, 20))
+        125
+
+    """
+
+    def __init__(self):
+        """The `__init__` method initialises four instance attributes."""
+
+        # :list: dates of the entries, in ascending order
+        self._dates = []
+        # :list: amounts of the entries in cents, positive for fines and
+        # negative for payments
+        self._amounts = []
+        # :list: kinds of the entries, `FINE` or `PAYMENT`
+        self._kinds = []
+        # :list: balance in cents after each entry (prefix sums of `_amounts`)
+        self._balances = []
+
+    def __len__(self):
+        """Return the number of entries in the ledger"""
+
+        return len(self._amounts)
+
+    @property
+    def balance(self):
+        """Current balance of the ledger.
+
+        :getter: Return the balance owed in cents after all entries
+        :rtype: int
+
+        """
+
+        return self._balances[-1] if self._balances else 0
+
+    def record(self, date, cents, kind):
+        """Append an entry to the ledger.
+
+        Entries dated on or after the latest entry are appended in O(1).
+        An earlier dated entry is inserted after the entries of the same
+        date, and the running balances after it are recomputed.
+
+        Args:
+            date (datetime): Date the fine was incurred or the payment made.
+            cents (int): Amount in cents, positive for a fine and negative
+                for a payment.
+            kind (str): `FINE` or `PAYMENT`.
+
+        """
+
+        position = len(self._dates)
+        if self._dates and date < self._dates[-1]:
+            position = bisect_right(self._dates, date)
+
+        self._dates.insert(position, date)
+        self._amounts.insert(position, cents)
+        self._kinds.insert(position, kind)
+        self._balances.insert(position, 0)
+
+        balance = self._balances[position - 1] if position else 0
+        for index in range(position, len(self._amounts)):
+            balance += self._amounts[index]
+            self._balances[index] = balance
+
+    def balance_as_of(self, date):
+        """Return the balance in cents after the entries dated up to `date`"""
+
+        position = bisect_right(self._dates, date)
+        return self._balances[position - 1] if position else 0
+
+    def totals(self):
+        """Return the total fines and total payments in cents, in one pass"""
+
+        fines = payments = 0
+        for cents, kind in zip(self._amounts, self._kinds):
+            if kind == FINE:
+                fines += cents
+            else:
+                payments -= cents
+        return fines, payments
+
+    def entries(self):
+        """Return the entries as (date, kind, cents, balance) tuples in date
+        order.
+        """
+
+        return list(zip(self._dates, self._kinds, self._amounts, self._balances))
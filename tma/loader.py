@@ -0,0 +1,313 @@
+"""
+Created on 18 Oct 2026
+
+Streaming loaders to populate a Library from CSV or JSON-lines files.
+
+Each file is read row by row and processed in chunks, so the raw file is
+never held in memory. The expected columns are:
+
+    items:   type (book/media), title, year_published, cost, authors
+    copies:  title, copies
+    members: member_id, name, type (member/junior, default to member)
+
+In CSV files, multiple authors are separated by ';'. In JSON-lines files,
+authors may also be given as a list.
+
+"""
+
+
+import argparse
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from q2 import Book, Media
+from q3 import JuniorMember, Library, LibraryException, Member
+
+
+CHUNK_SIZE = 10000
+
+ITEM_TYPES = {"book": Book, "media": Media}
+MEMBER_TYPES = {"member": Member, "junior": JuniorMember}
+
+
+class LoadReport:
+    """A class to represent the outcome of loading one file into a library.
+
+    Example:
+        >>> report = LoadReport('items.csv', 1000, 0.5)
+
+    """
+
+    def __init__(self, path, rows, seconds):
+        """The `__init__` method initialises three instance attributes.
+
+        Args:
+            path (str): The path of the file that was loaded.
+            rows (int): The number of rows that were loaded.
+            seconds (float): The time taken to load the file.
+
+        """
+
+        self._path = path
+        self._rows = rows
+        self._seconds = seconds
+
+    @property
+    def path(self):
+        """The path of the loaded file
+
+        :getter: Return the path of the loaded file
+        :rtype: str
+
+        """
+
+        return self._path
+
+    @property
+    def rows(self):
+        """The number of rows loaded
+
+        :getter: Return the number of rows loaded from the file
+        :rtype: int
+
+        """
+
+        return self._rows
+
+    @property
+    def seconds(self):
+        """The time taken to load the file
+
+        :getter: Return the time taken in seconds
+        :rtype: float
+
+        """
+
+        return self._seconds
+
+    def rows_per_second(self):
+        """Return the loading throughput of the file in rows per second"""
+
+        return self._rows / self._seconds if self._seconds else float(self._rows)
+
+    def __str__(self):
+        return (
+            f"{self._path}: {self._rows} rows in {self._seconds:.2f}s "
+            f"({self.rows_per_second():.0f} rows/sec)"
+        )
+
+
+def _iter_rows(path):
+    """Yield `(line_number, row)` for each record of a CSV or JSON-lines file.
+
+    The file format is determined by the file extension, '.csv' for CSV and
+    '.jsonl', '.ndjson' or '.json' for JSON-lines.
+
+    Raises:
+        LibraryException: If the file extension is not supported or a JSON
+            line cannot be parsed.
+
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as file:
+        if extension == ".csv":
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+        elif extension in (".jsonl", ".ndjson", ".json"):
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    raise LibraryException(f"{path}:{line_number}: {e}")
+        else:
+            raise LibraryException(f"Unsupported file format: {path}")
+
+
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yield lists of at most `chunk_size` `(line_number, row)` records"""
+
+    rows = _iter_rows(path)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def _field(row, name, path, line_number, default=None):
+    """Return the stripped field `name` of a row, raising if it is missing"""
+
+    value = row.get(name, default)
+    if value is None or value == "":
+        if default is not None:
+            return default
+        raise LibraryException(f"{path}:{line_number}: missing '{name}'")
+    return value.strip() if isinstance(value, str) else value
+
+
+def _build_item(row, path, line_number):
+    """Create a Book or Media object from an item row"""
+
+    item_type = str(_field(row, "type", path, line_number)).lower()
+    if item_type not in ITEM_TYPES:
+        raise LibraryException(f"{path}:{line_number}: unknown item type {item_type}")
+    title = _field(row, "title", path, line_number)
+    year_published = _field(row, "year_published", path, line_number)
+    cost = _field(row, "cost", path, line_number)
+
+    try:
+        if item_type == "book":
+            authors = row.get("authors") or []
+            if isinstance(authors, str):
+                authors = [name.strip() for name in authors.split(";") if name.strip()]
+            return Book(title, year_published, cost, authors)
+        return Media(title, year_published, cost)
+    except ValueError as e:
+        raise LibraryException(f"{path}:{line_number}: {e}")
+
+
+def _load(path, load_row, chunk_size):
+    """Apply `load_row` to every row of `path` and report the throughput"""
+
+    rows = 0
+    start = time.perf_counter()
+    for chunk in read_chunks(path, chunk_size):
+        for line_number, row in chunk:
+            load_row(row, line_number)
+        rows += len(chunk)
+
+    return LoadReport(path, rows, time.perf_counter() - start)
+
+
+def load_items(library, path, chunk_size=CHUNK_SIZE):
+    """Add the Book and Media items listed in `path` to `library`
+
+    Items with a title that already exists in the library are skipped.
+
+    Returns:
+        report (LoadReport): The number of rows loaded and time taken.
+
+    """
+
+    def load_row(row, line_number):
+        library.add_item(_build_item(row, path, line_number))
+
+    return _load(path, load_row, chunk_size)
+
+
+def load_copies(library, path, chunk_size=CHUNK_SIZE):
+    """Add the number of copies listed in `path` for items in `library`
+
+    Raises:
+        LibraryException: If the title does not match an item in the library,
+            or the number of copies is not a whole number of 0 or more.
+
+    Returns:
+        report (LoadReport): The number of rows loaded and time taken.
+
+    """
+
+    def load_row(row, line_number):
+        title = _field(row, "title", path, line_number)
+        item = library.search_item(title)
+        if item is None:
+            raise LibraryException(f"{path}:{line_number}: no item titled {title}")
+        try:
+            copies = int(_field(row, "copies", path, line_number))
+        except ValueError as e:
+            raise LibraryException(f"{path}:{line_number}: {e}")
+        if copies < 0:
+            raise LibraryException(
+                f"{path}:{line_number}: negative number of copies {copies}"
+            )
+        for _ in range(copies):
+            library.add_copy_item(item)
+
+    return _load(path, load_row, chunk_size)
+
+
+def load_members(library, path, chunk_size=CHUNK_SIZE):
+    """Register the members listed in `path` with `library`
+
+    Members with an id that is already registered are skipped.
+
+    Returns:
+        report (LoadReport): The number of rows loaded and time taken.
+
+    """
+
+    def load_row(row, line_number):
+        member_type = str(_field(row, "type", path, line_number, "member")).lower()
+        if member_type not in MEMBER_TYPES:
+            raise LibraryException(
+                f"{path}:{line_number}: unknown member type {member_type}"
+            )
+        # JSON-lines ids may be numbers
+        member_id = str(_field(row, "member_id", path, line_number))
+        name = _field(row, "name", path, line_number)
+        library.register_member(MEMBER_TYPES[member_type](member_id.upper(), name))
+
+    return _load(path, load_row, chunk_size)
+
+
+def load_library(items, copies=None, members=None, library=None, chunk_size=CHUNK_SIZE):
+    """Populate a library from an items file, and optional copies and members
+    files.
+
+    Args:
+        items (str): Path of the items file.
+        copies (str): Path of the copies file, default to [None].
+        members (str): Path of the members file, default to [None].
+        library (Library): Library to populate, default to a new Library.
+        chunk_size (int): Number of rows processed per chunk.
+
+    Returns:
+        library (Library): The populated library.
+        reports (list): A LoadReport for each file loaded.
+
+    """
+
+    if library is None:
+        library = Library()
+
+    reports = [load_items(library, items, chunk_size)]
+    if copies:
+        reports.append(load_copies(library, copies, chunk_size))
+    if members:
+        reports.append(load_members(library, members, chunk_size))
+
+    return library, reports
+
+
+def main():
+    """Load a library from the files given on the command line"""
+
+    parser = argparse.ArgumentParser(
+        description="Populate a Library from CSV or JSON-lines files"
+    )
+    parser.add_argument("items", help="CSV or JSON-lines file of items")
+    parser.add_argument("--copies", help="CSV or JSON-lines file of copies")
+    parser.add_argument("--members", help="CSV or JSON-lines file of members")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    try:
+        _, reports = load_library(
+            args.items, args.copies, args.members, chunk_size=args.chunk_size
+        )
+    except (LibraryException, OSError) as e:
+        parser.exit(1, f"{e}\n")
+
+    for report in reports:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
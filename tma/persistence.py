@@ -0,0 +1,265 @@
+"""
+Created on 18 Oct 2026
+
+Persistent storage of Library state as a binary snapshot and a
+write-ahead journal.
+
+The snapshot holds the whole Library, and the journal is an append-only
+log of the borrow, renew, return, pay and hold operations made since. On
+restart, the snapshot is loaded and only the tail of the journal is
+replayed. Once the journal grows past `compact_every` records, a new
+snapshot is written and the journal is truncated.
+
+"""
+
+
+import json
+import os
+import pickle
+import sys
+from datetime import datetime
+
+from q2 import ItemCopy
+from q3 import (
+    Library,
+    LibraryApplication,
+    LibraryException,
+    initialise_library,
+    populated_items,
+)
+
+
+SNAPSHOT_MAGIC = b"LIBSNAP1"
+
+
+class LibraryStore:
+    """A class to represent the on-disk state of a library.
+
+    Example:
+        >>> store = LibraryStore('data')
+        >>> library = store.open()
+        >>> store.record('pay', 'S123', 2.00)
+
+    """
+
+    def __init__(self, directory, sync_every=32, compact_every=10000):
+        """The `__init__` method initialises eight instance attributes.
+
+        Args:
+            directory (str): The directory holding the snapshot and journal.
+            sync_every (int): Number of journal records written between
+                fsync calls, default to [32].
+            compact_every (int): Number of journal records after which a new
+                snapshot is written, default to [10000].
+
+        """
+
+        self._directory = directory
+        self._sync_every = sync_every
+        self._compact_every = compact_every
+        # :Library: The library being persisted, set by `open`
+        self._library = None
+        # :int: Sequence number of the last operation recorded
+        self._seq = 0
+        # :int: Number of journal records since the last snapshot
+        self._journal_records = 0
+        # :int: Number of journal records written since the last fsync
+        self._unsynced = 0
+        # :file: The journal opened for appending, set by `open`
+        self._journal = None
+
+    @property
+    def snapshot_path(self):
+        """Path of the snapshot file"""
+
+        return os.path.join(self._directory, "library.snapshot")
+
+    @property
+    def journal_path(self):
+        """Path of the journal file"""
+
+        return os.path.join(self._directory, "library.journal")
+
+    def open(self, initialise=None):
+        """Load the snapshot and replay the journal tail.
+
+        If no snapshot exists, `initialise` is called to create the library
+        (default to an empty Library), and an initial snapshot is written.
+
+        Args:
+            initialise (callable): Returns a new Library, default to [None].
+
+        Returns:
+            library (Library): The restored library.
+
+        """
+
+        os.makedirs(self._directory, exist_ok=True)
+
+        if os.path.exists(self.snapshot_path):
+            self._library, self._seq = self._read_snapshot()
+            self._replay()
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        else:
+            self._library = initialise() if initialise else Library()
+            self.compact()
+
+        return self._library
+
+    def _read_snapshot(self):
+        """Return the library and sequence number stored in the snapshot"""
+
+        with open(self.snapshot_path, "rb") as file:
+            if file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise LibraryException(f"{self.snapshot_path} is not a snapshot")
+            state = pickle.load(file)
+
+        # Copy ids continue from where the snapshotted library left off
+        ItemCopy._NEXT_ID = max(ItemCopy._NEXT_ID, state["next_copy_id"])
+        return state["library"], state["seq"]
+
+    def _replay(self):
+        """Apply journal records that are newer than the snapshot"""
+
+        if not os.path.exists(self.journal_path):
+            return
+
+        valid_end = 0
+        with open(self.journal_path, "rb") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn final write, nothing after it was synced
+                valid_end += len(line)
+                if record["seq"] <= self._seq:
+                    continue
+                apply(self._library, record["op"], record["args"])
+                self._seq = record["seq"]
+                self._journal_records += 1
+
+        # Drop a torn tail so that new records are appended after valid ones
+        if valid_end < os.path.getsize(self.journal_path):
+            os.truncate(self.journal_path, valid_end)
+
+    def record(self, op, *args):
+        """Append an operation that has been applied to the library.
+
+        Args:
+            op (str): One of the operations accepted by `apply`.
+            *args: The arguments of the operation, as accepted by `apply`.
+
+        """
+
+        self._seq += 1
+        args = [arg.isoformat() if isinstance(arg, datetime) else arg for arg in args]
+        self._journal.write(json.dumps({"seq": self._seq, "op": op, "args": args}))
+        self._journal.write("\n")
+        self._journal_records += 1
+        self._unsynced += 1
+
+        if self._unsynced >= self._sync_every:
+            self.sync()
+        if self._journal_records >= self._compact_every:
+            self.compact()
+
+    def sync(self):
+        """Flush the journal and fsync it to disk"""
+
+        if self._journal is not None and self._unsynced:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._unsynced = 0
+
+    def compact(self):
+        """Write a snapshot of the library and truncate the journal"""
+
+        state = {
+            "seq": self._seq,
+            "next_copy_id": ItemCopy._NEXT_ID,
+            "library": self._library,
+        }
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(SNAPSHOT_MAGIC)
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        # Atomic swap, a crash leaves either the old or the new snapshot
+        os.replace(temp_path, self.snapshot_path)
+
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "w", encoding="utf-8")
+        self._journal_records = 0
+        self._unsynced = 0
+
+    def close(self):
+        """Sync and close the journal"""
+
+        if self._journal is not None:
+            self.sync()
+            self._journal.close()
+            self._journal = None
+
+
+def apply(library, op, args):
+    """Apply a journalled operation to the library.
+
+    Args:
+        library (Library): The library to apply the operation to.
+        op (str): One of 'borrow', 'renew', 'return', 'pay', 'hold' or
+            'cancel_hold'.
+        args (list): [member_id, copy_id, date] for 'borrow',
+            [member_id, title, date] for 'renew', [member_id, title, date,
+            fines_per_day] for 'return' (journals written before returns
+            kept their rate have none, and are charged the current rate),
+            [member_id, amount, date] for 'pay' (journals written before
+            payments were dated have no date), and [member_id, title] for
+            'hold' and 'cancel_hold'. Dates are in ISO format.
+
+    Raises:
+        LibraryException: If the operation or member id is unknown.
+
+    """
+
+    member = library.search_member(args[0])
+    if member is None:
+        raise LibraryException(f"Journal refers to unknown member {args[0]}")
+
+    if op == "borrow":
+        item_copy = library.search_copy_item(args[1])
+        member.borrow_item(item_copy, datetime.fromisoformat(args[2]))
+    elif op == "renew":
+        member.renew(args[1], datetime.fromisoformat(args[2]))
+    elif op == "return":
+        member.return_item(args[1], datetime.fromisoformat(args[2]), *args[3:])
+    elif op == "pay":
+        member.pay(args[1], *(datetime.fromisoformat(date) for date in args[2:]))
+    elif op == "hold":
+        library.place_hold(member, args[1])
+    elif op == "cancel_hold":
+        library.cancel_hold(member, args[1])
+    else:
+        raise LibraryException(f"Unknown journal operation {op}")
+
+
+def main():
+    """Present the LibraryApplication menu over a library persisted in the
+    directory given on the command line (default to 'library_data').
+
+    """
+
+    store = LibraryStore(sys.argv[1] if len(sys.argv) > 1 else "library_data")
+    library = store.open(
+        lambda: initialise_library(*populated_items(), Library())
+    )
+    menu = LibraryApplication(library, store)
+
+    while True:
+        menu.menu()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+Created on 18 Oct 2026
+
+Loan policy of the library: loan durations, loan quotas, fines and admin
+charges.
+
+The rules are plain data (`DEFAULT_RULES`, or a JSON file of the same shape
+merged over it) and are compiled into a `Policy` of lookup tables keyed by
+member and item class, so that reading a rule is a dictionary lookup.
+
+The active policy is swapped atomically: `set_policy`, `update` and `configure`
+replace it as a whole, and `refresh` reloads the configured JSON file if it
+has changed since it was loaded. The file is configured with `configure`, or
+with the LIBRARY_POLICY environment variable.
+
+Example rules file, shortening media loans for junior members:
+
+    {
+        "members": {"JuniorMember": {"loan_quota": 3}},
+        "loans": [{"member": "JuniorMember", "item": "Media", "loan_duration": 2}]
+    }
+
+"""
+
+
+import copy
+import json
+import os
+import sys
+import threading
+
+
+DEFAULT_RULES = {
+    # Rules per item type, looked up along the item class's MRO
+    "items": {
+        "Item": {"loan_duration": 14},
+        "Book": {
+            "fines_per_day": 0.25,
+            # Rate of (span - age) / span of the cost, or a floor rate once
+            # the book is `span` or more years old
+            "admin_charge": {"kind": "age_scaled", "span": 10, "floor_rate": 0.10},
+        },
+        "Media": {
+            "loan_duration": 3,
+            "fines_per_day": 2.50,
+            "admin_charge": {"kind": "rate", "rate": 1.5},
+        },
+    },
+    # Rules per member type, looked up along the member class's MRO
+    "members": {
+        "Member": {"loan_quota": 4},
+        "JuniorMember": {"loan_quota": 2},
+    },
+    # Loan durations for particular (member type, item type) pairs, taking
+    # precedence over the item type's duration
+    "loans": [],
+}
+
+
+class PolicyException(Exception):
+    """Raised when loan rules are invalid or name no matching class"""
+
+
+class AdminCharge:
+    """A class to represent the admin charge rule of an item type.
+
+    Attributes:
+        kind (str): 'rate' for a fixed rate of the cost, or 'age_scaled' for
+            a rate decreasing with the item's age.
+
+    """
+
+    __slots__ = ("kind", "rate", "span", "floor_rate")
+
+    def __init__(self, kind, rate=0.0, span=10, floor_rate=0.0):
+        """The `__init__` method initialises four attributes.
+
+        Args:
+            kind (str): 'rate' or 'age_scaled'.
+            rate (float): Rate of the cost charged for 'rate' rules.
+            span (int): Age in years at which 'age_scaled' rules reach their
+                floor rate.
+            floor_rate (float): Rate of the cost charged for 'age_scaled'
+                rules once the item is `span` or more years old.
+
+        """
+
+        if kind not in ("rate", "age_scaled"):
+            raise PolicyException(f"Unknown admin charge kind {kind}")
+        self.kind = kind
+        self.rate = float(rate)
+        self.span = int(span)
+        self.floor_rate = float(floor_rate)
+
+    def charge(self, cost, age):
+        """Return the admin charge of an item of `cost`, `age` years old"""
+
+        if self.kind == "rate":
+            return self.rate * cost
+        if age >= self.span:
+            return self.floor_rate * cost
+        return ((self.span - age) / self.span) * cost
+
+
+class Policy:
+    """A class to represent compiled loan rules.
+
+    Rules are compiled lazily for each class they are asked about, resolving
+    the class's MRO against the rule names once, then served from a
+    dictionary.
+
+    Example:
+        >>> policy = Policy(DEFAULT_RULES)
+        >>> policy.loan_duration(Member, Media)
+        3
+
+    """
+
+    def __init__(self, rules):
+        """The `__init__` method initialises six instance attributes.
+
+        Args:
+            rules (dict): Rules of the shape of `DEFAULT_RULES`.
+
+        """
+
+        self._rules = rules
+        self._item_rules = rules.get("items", {})
+        self._member_rules = rules.get("members", {})
+        # :dict: compiled values, with key as (rule name, class[, class])
+        self._table = {}
+        # :Lock: guards compilation into `_table`
+        self._lock = threading.Lock()
+        try:
+            # :dict: loan durations, with key as (member name, item name)
+            self._pair_durations = {
+                (rule["member"], rule["item"]): int(rule["loan_duration"])
+                for rule in rules.get("loans", [])
+            }
+            self._validate()
+        except (KeyError, TypeError, ValueError) as e:
+            raise PolicyException(f"Invalid loan rules: {e!r}")
+
+    def _validate(self):
+        """Check the values of every named rule, so that invalid rules are
+        rejected before the policy is used.
+        """
+
+        for rule in self._item_rules.values():
+            if "admin_charge" in rule:
+                AdminCharge(**rule["admin_charge"])
+            for key in ("loan_duration", "fines_per_day"):
+                if key in rule:
+                    float(rule[key])
+        for rule in self._member_rules.values():
+            if "loan_quota" in rule:
+                int(rule["loan_quota"])
+
+    @property
+    def rules(self):
+        """Rules the policy was compiled from.
+
+        :getter: Return a copy of the rules
+        :rtype: dict
+
+        """
+
+        return copy.deepcopy(self._rules)
+
+    @staticmethod
+    def _lookup(rules, cls, key):
+        """Return the value of `key` for the closest class along `cls`'s MRO
+        that has one in `rules`.
+        """
+
+        for base in cls.__mro__:
+            rule = rules.get(base.__name__)
+            if rule is not None and key in rule:
+                return rule[key]
+        raise PolicyException(f"No {key} rule for {cls.__name__}")
+
+    def _compile(self, table_key, compile_value, *args):
+        """Compile and store the value for `table_key` on first use"""
+
+        with self._lock:
+            value = self._table[table_key] = compile_value(*args)
+        return value
+
+    def _compile_loan_duration(self, member_type, item_type):
+        """Resolve the loan duration of a (member type, item type) pair"""
+
+        if member_type is not None:
+            for member_base in member_type.__mro__:
+                for item_base in item_type.__mro__:
+                    duration = self._pair_durations.get(
+                        (member_base.__name__, item_base.__name__)
+                    )
+                    if duration is not None:
+                        return duration
+        return int(self._lookup(self._item_rules, item_type, "loan_duration"))
+
+    def loan_duration(self, member_type, item_type):
+        """Return the loan duration in days of `item_type` items lent to
+        `member_type` members (None for the item type's own duration).
+        """
+
+        table_key = ("loan_duration", member_type, item_type)
+        value = self._table.get(table_key)
+        if value is None:
+            value = self._compile(
+                table_key, self._compile_loan_duration, member_type, item_type
+            )
+        return value
+
+    def fines_per_day(self, item_type):
+        """Return the fines per day exceeding the due date for `item_type`"""
+
+        table_key = ("fines_per_day", item_type)
+        value = self._table.get(table_key)
+        if value is None:
+            value = self._compile(
+                table_key,
+                lambda: float(
+                    self._lookup(self._item_rules, item_type, "fines_per_day")
+                ),
+            )
+        return value
+
+    def admin_charge_rule(self, item_type):
+        """Return the AdminCharge rule of `item_type`"""
+
+        table_key = ("admin_charge", item_type)
+        value = self._table.get(table_key)
+        if value is None:
+            value = self._compile(
+                table_key,
+                lambda: AdminCharge(
+                    **self._lookup(self._item_rules, item_type, "admin_charge")
+                ),
+            )
+        return value
+
+    def admin_charge(self, item_type, cost, age):
+        """Return the admin charge of an `item_type` item of `cost` that is
+        `age` years old.
+        """
+
+        return self.admin_charge_rule(item_type).charge(cost, age)
+
+    def loan_quota(self, member_type):
+        """Return the number of unreturned loans a `member_type` may have"""
+
+        table_key = ("loan_quota", member_type)
+        value = self._table.get(table_key)
+        if value is None:
+            value = self._compile(
+                table_key,
+                lambda: int(
+                    self._lookup(self._member_rules, member_type, "loan_quota")
+                ),
+            )
+        return value
+
+
+def merge_rules(base, overrides):
+    """Return `base` rules with `overrides` merged in per item and member
+    type, and the pair durations of both.
+    """
+
+    rules = copy.deepcopy(base)
+    for section in ("items", "members"):
+        for name, rule in overrides.get(section, {}).items():
+            rules.setdefault(section, {}).setdefault(name, {}).update(rule)
+    rules["loans"] = rules.get("loans", []) + list(overrides.get("loans", []))
+    return rules
+
+
+# :Policy: the active policy, replaced as a whole when rules change
+_active = Policy(DEFAULT_RULES)
+# :str: path of the JSON rules file, and its mtime when last loaded
+_config_path = None
+_config_mtime = None
+# :str: last problem reported with the rules file, not repeated until it changes
+_reported = None
+_swap_lock = threading.Lock()
+
+
+def current():
+    """Return the active policy"""
+
+    return _active
+
+
+def set_policy(policy):
+    """Make `policy` the active policy"""
+
+    global _active
+    _active = policy
+
+
+def update(overrides):
+    """Merge `overrides` into the active rules and make the result active"""
+
+    with _swap_lock:
+        set_policy(Policy(merge_rules(_active.rules, overrides)))
+
+
+def load(path):
+    """Return the Policy of the JSON rules file at `path`, merged over
+    `DEFAULT_RULES`.
+
+    Raises:
+        PolicyException: If the file cannot be read or holds invalid rules.
+
+    """
+
+    try:
+        with open(path, encoding="utf-8") as file:
+            overrides = json.load(file)
+        return Policy(merge_rules(DEFAULT_RULES, overrides))
+    except (OSError, ValueError) as e:
+        raise PolicyException(f"Cannot load loan policy from {path}: {e}")
+
+
+def _report(problem):
+    """Report a problem with the rules file on stderr, once until it changes"""
+
+    global _reported
+    if problem != _reported:
+        _reported = problem
+        print(f"{problem}, keeping the active loan policy", file=sys.stderr)
+
+
+def configure(path):
+    """Load the rules file at `path` and watch it for changes with `refresh`
+
+    Raises:
+        PolicyException: If the file cannot be read or holds invalid rules,
+            the active policy being left in place.
+
+    """
+
+    global _config_path, _config_mtime, _reported
+    with _swap_lock:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError as e:
+            raise PolicyException(f"Cannot load loan policy from {path}: {e}")
+        set_policy(load(path))
+        _config_path, _config_mtime = path, mtime
+        _reported = None
+
+
+def refresh():
+    """Reload the configured rules file if it changed since it was loaded.
+
+    A file that is missing or fails to load leaves the active policy in
+    place, and is reported on stderr.
+
+    Returns:
+        (bool): True if a new policy was made active.
+
+    """
+
+    global _config_mtime, _reported
+    if _config_path is None:
+        return False
+    try:
+        mtime = os.stat(_config_path).st_mtime_ns
+    except OSError as e:
+        _report(f"Cannot load loan policy from {_config_path}: {e}")
+        return False
+    if mtime == _config_mtime:
+        return False
+
+    with _swap_lock:
+        _config_mtime = mtime
+        try:
+            set_policy(load(_config_path))
+        except PolicyException as e:
+            _report(str(e))
+            return False
+        _reported = None
+    return True
+
+
+if os.environ.get("LIBRARY_POLICY"):
+    try:
+        configure(os.environ["LIBRARY_POLICY"])
+    except PolicyException as e:
+        # a bad rules file must not stop the library from being imported
+        _report(str(e))
@@ -0,0 +1,202 @@
+"""
+Created on 18 Oct 2026
+
+Opt-in instrumentation of the public methods of the library classes.
+
+`Profiler.instrument` replaces each public method of the given classes by a
+wrapper recording its call count, latency and net memory blocks allocated
+(from `sys.getallocatedblocks`). Nothing is wrapped unless profiling is
+enabled, so there is no overhead otherwise.
+
+q3 enables profiling when the LIBRARY_PROFILE environment variable is set,
+and the report is written on exit: as JSON to the file named by the
+variable if it ends in '.json', else as text to stderr.
+
+    LIBRARY_PROFILE=1 python q3.py
+    LIBRARY_PROFILE=profile.json python q3.py
+
+"""
+
+
+import atexit
+import inspect
+import json
+import sys
+import threading
+import time
+from array import array
+from functools import wraps
+
+
+class OperationStats:
+    """A class to represent the recorded calls of one method.
+
+    Example:
+        >>> stats = OperationStats()
+        >>> stats.record(1500, 2, False)
+
+    """
+
+    __slots__ = ("_latencies", "_blocks", "_errors")
+
+    def __init__(self):
+        """The `__init__` method initialises three instance attributes."""
+
+        # :array: latency of every call in nanoseconds
+        self._latencies = array("q")
+        # :int: net memory blocks allocated over all calls
+        self._blocks = 0
+        # :int: number of calls that raised
+        self._errors = 0
+
+    def record(self, nanoseconds, blocks, raised):
+        """Record one call of the method"""
+
+        self._latencies.append(nanoseconds)
+        self._blocks += blocks
+        if raised:
+            self._errors += 1
+
+    def summary(self):
+        """Summarise the recorded calls.
+
+        Returns:
+            summary (dict): 'calls', 'errors', cumulative 'total_ms', and
+                'mean_us' and 'p99_us' latency, and 'blocks_per_call' net
+                memory blocks allocated.
+
+        """
+
+        count = len(self._latencies)
+        total = sum(self._latencies)
+        latencies = sorted(self._latencies)
+        return {
+            "calls": count,
+            "errors": self._errors,
+            "total_ms": total / 1e6,
+            "mean_us": total / count / 1000 if count else 0.0,
+            "p99_us": latencies[min(count - 1, int(0.99 * count))] / 1000
+            if count
+            else 0.0,
+            "blocks_per_call": self._blocks / count if count else 0.0,
+        }
+
+
+class Profiler:
+    """A class to represent the instrumentation of classes' public methods.
+
+    Example:
+        >>> profiler = Profiler()
+        >>> profiler.instrument(Library, Member)
+        >>> print(profiler.report())
+
+    """
+
+    def __init__(self):
+        """The `__init__` method initialises three instance attributes."""
+
+        # :dict: OperationStats, with key as 'Class.method'
+        self._stats = {}
+        # :list: (class, name, original method) replaced by `instrument`
+        self._originals = []
+        # :Lock: guards the recording of calls from several threads
+        self._lock = threading.Lock()
+
+    def _wrap(self, name, method):
+        """Return `method` wrapped to record its calls under `name`"""
+
+        stats = self._stats.setdefault(name, OperationStats())
+        lock = self._lock
+        clock = time.perf_counter_ns
+        blocks = sys.getallocatedblocks
+
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            raised = True
+            start_blocks = blocks()
+            start = clock()
+            try:
+                result = method(*args, **kwargs)
+                raised = False
+                return result
+            finally:
+                elapsed = clock() - start
+                with lock:
+                    stats.record(elapsed, blocks() - start_blocks, raised)
+
+        return wrapper
+
+    def instrument(self, *classes):
+        """Wrap the public methods defined by each class.
+
+        Properties, class and static methods are left as they are. Methods
+        inherited from an instrumented class are recorded under that class.
+
+        """
+
+        for cls in classes:
+            for name, method in list(vars(cls).items()):
+                if name.startswith("_") or not inspect.isfunction(method):
+                    continue
+                self._originals.append((cls, name, method))
+                setattr(cls, name, self._wrap(f"{cls.__name__}.{name}", method))
+
+    def uninstrument(self):
+        """Restore the methods replaced by `instrument`"""
+
+        while self._originals:
+            cls, name, method = self._originals.pop()
+            setattr(cls, name, method)
+
+    def results(self):
+        """Return the summary of each method called, with key as
+        'Class.method', by descending cumulative time.
+        """
+
+        summaries = [(name, stats.summary()) for name, stats in self._stats.items()]
+        return dict(
+            sorted(
+                ((name, summary) for name, summary in summaries if summary["calls"]),
+                key=lambda item: -item[1]["total_ms"],
+            )
+        )
+
+    def report(self):
+        """Return the results as a text table"""
+
+        lines = [
+            f"{'operation':<40}{'calls':>8}{'errors':>8}{'total ms':>11}"
+            f"{'mean us':>10}{'p99 us':>10}{'blocks/call':>13}"
+        ]
+        for name, summary in self.results().items():
+            lines.append(
+                f"{name:<40}{summary['calls']:>8}{summary['errors']:>8}"
+                f"{summary['total_ms']:>11.2f}{summary['mean_us']:>10.1f}"
+                f"{summary['p99_us']:>10.1f}{summary['blocks_per_call']:>13.1f}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, destination):
+        """Write the results as JSON to `destination` if it ends in '.json',
+        else as a text report to stderr.
+        """
+
+        if destination.endswith(".json"):
+            with open(destination, "w", encoding="utf-8") as file:
+                json.dump(self.results(), file, indent=2)
+        else:
+            print(self.report(), file=sys.stderr)
+
+
+def install(destination, *classes):
+    """Instrument `classes` and dump the results to `destination` on exit.
+
+    Returns:
+        profiler (Profiler): The profiler recording the calls.
+
+    """
+
+    profiler = Profiler()
+    profiler.instrument(*classes)
+    atexit.register(profiler.dump, destination)
+    return profiler
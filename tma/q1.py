@@ -1,6 +1,12 @@
+from array import array
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 
 
+class BookingException(Exception):
+    """Exception class for bookings that cannot be made."""
+
+
 # Q1(a)
 class Customer:
     """A class to represent a customer.
@@ -66,7 +72,7 @@ class Staycation:
         """Constructs and initialises all necessary attributes for the
         Staycation object.
 
-        The `__init__` method initialises four attributes.
+        The `__init__` method initialises five attributes.
 
         Args:
             hotel_name (str):  The name of the staycation hotel.
@@ -80,6 +86,9 @@ class Staycation:
         self._nights = int(nights)
         self._cost = float(cost)
         self._voucher_allowed = voucher_allowed
+        # :list: callbacks notified as `listener(staycation, old_cost)` when
+        # the cost is set
+        self._listeners = []
 
     @property
     def hotel_name(self):
@@ -117,7 +126,20 @@ class Staycation:
 
     @cost.setter
     def cost(self, new_cost):
+        old_cost = self._cost
         self._cost = float(new_cost)
+        for listener in self._listeners:
+            listener(self, old_cost)
+
+    def add_listener(self, listener):
+        """Register a callable notified when the cost is set"""
+
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Unregister a callable added with `add_listener`"""
+
+        self._listeners.remove(listener)
 
     @property
     def voucher_allowed(self):
@@ -178,6 +200,230 @@ class Staycation:
         )
 
 
+class PriceIndex:
+    """A class to represent staycations sorted by cost per night.
+
+    Costs per night and staycations are kept in parallel sorted chunks of at
+    most `2 * LOAD` entries, with the highest price of each chunk alongside.
+    A price is located by bisecting the chunks' highest prices, then within
+    the chunk, and inserting or removing only moves the entries of one
+    chunk, so the index stays fast at hundreds of thousands of staycations.
+
+    Example:
+        >>> index = PriceIndex()
+        >>> index.insert(Staycation('Hotel Bugis', 1, 168))
+        >>> index.cheapest(1)
+
+    """
+
+    LOAD = 512
+
+    def __init__(self):
+        """The `__init__` method initialises four attributes."""
+
+        # :list: chunks of costs per night, each in ascending order
+        self._prices = []
+        # :list: chunks of staycations, in the order of `_prices`
+        self._staycations = []
+        # :list: highest cost per night of each chunk
+        self._maxes = []
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def insert(self, staycation, price=None):
+        """Insert `staycation` at its cost per night, or at `price` if given"""
+
+        if price is None:
+            price = staycation.cost_per_night()
+        self._length += 1
+        if not self._maxes:
+            self._prices.append([price])
+            self._staycations.append([staycation])
+            self._maxes.append(price)
+            return
+
+        chunk = min(bisect_right(self._maxes, price), len(self._maxes) - 1)
+        prices, staycations = self._prices[chunk], self._staycations[chunk]
+        position = bisect_right(prices, price)
+        prices.insert(position, price)
+        staycations.insert(position, staycation)
+        self._maxes[chunk] = prices[-1]
+
+        if len(prices) > 2 * self.LOAD:  # split the chunk in two
+            self._prices.insert(chunk + 1, prices[self.LOAD :])
+            self._staycations.insert(chunk + 1, staycations[self.LOAD :])
+            self._maxes.insert(chunk + 1, prices[-1])
+            del prices[self.LOAD :]
+            del staycations[self.LOAD :]
+            self._maxes[chunk] = prices[-1]
+
+    def remove(self, staycation, price=None):
+        """Remove `staycation` indexed at its cost per night, or at `price`
+        if given.
+
+        Returns:
+            (bool): False if `staycation` was not indexed at that price.
+
+        """
+
+        if price is None:
+            price = staycation.cost_per_night()
+        chunk = bisect_left(self._maxes, price)
+        # staycations of the same price are compared by identity, and may
+        # run over several chunks
+        while chunk < len(self._maxes):
+            prices, staycations = self._prices[chunk], self._staycations[chunk]
+            position = bisect_left(prices, price)
+            while position < len(prices) and prices[position] == price:
+                if staycations[position] is staycation:
+                    del prices[position]
+                    del staycations[position]
+                    self._length -= 1
+                    if prices:
+                        self._maxes[chunk] = prices[-1]
+                    else:
+                        del self._prices[chunk]
+                        del self._staycations[chunk]
+                        del self._maxes[chunk]
+                    return True
+                position += 1
+            if position < len(prices):
+                break
+            chunk += 1
+        return False
+
+    def _iter_from(self, chunk, position):
+        """Yield (price, staycation) in order from `position` of `chunk`"""
+
+        for chunk in range(chunk, len(self._prices)):
+            prices, staycations = self._prices[chunk], self._staycations[chunk]
+            for index in range(position, len(prices)):
+                yield prices[index], staycations[index]
+            position = 0
+
+    def cheapest(self, k):
+        """Return the `k` cheapest staycations per night, cheapest first"""
+
+        cheapest = []
+        for staycations in self._staycations:
+            if len(cheapest) >= k:
+                break
+            cheapest.extend(staycations[: k - len(cheapest)])
+        return cheapest
+
+    def price_range(self, low, high, limit=None):
+        """Return the staycations costing from `low` to `high` per night,
+        cheapest first, up to `limit` of them.
+        """
+
+        chunk = bisect_left(self._maxes, low)
+        if chunk == len(self._maxes):
+            return []
+        position = bisect_left(self._prices[chunk], low)
+
+        found = []
+        for price, staycation in self._iter_from(chunk, position):
+            if price > high or len(found) == limit:
+                break
+            found.append(staycation)
+        return found
+
+
+class StaycationCatalogue:
+    """A class to represent a catalogue of staycations ordered by cost per
+    night, across all hotels and per hotel.
+
+    The catalogue listens to the cost of its staycations, and moves a
+    staycation to its new place when its cost is set.
+
+    Example:
+        >>> catalogue = StaycationCatalogue()
+        >>> catalogue.add(Staycation('Grand Marina', 2, 398, False))
+        >>> catalogue.add(Staycation('Hotel Bugis', 1, 168))
+        >>> catalogue.cheapest(1)[0].hotel_name
+        'Hotel Bugis'
+
+    """
+
+    def __init__(self):
+        """The `__init__` method initialises three attributes."""
+
+        # :set: staycations in the catalogue
+        self._staycations = set()
+        # :PriceIndex: every staycation of the catalogue
+        self._index = PriceIndex()
+        # :dict: PriceIndex of each hotel's staycations, with key as
+        # `hotel_name`
+        self._hotels = {}
+
+    def __len__(self):
+        return len(self._staycations)
+
+    def __contains__(self, staycation):
+        return staycation in self._staycations
+
+    def add(self, staycation):
+        """Add `staycation` to the catalogue, if not already in it"""
+
+        if staycation in self._staycations:
+            return False
+        self._staycations.add(staycation)
+        self._index.insert(staycation)
+        self._hotels.setdefault(staycation.hotel_name, PriceIndex()).insert(staycation)
+        staycation.add_listener(self._cost_changed)
+        return True
+
+    def remove(self, staycation):
+        """Remove `staycation` from the catalogue, if in it"""
+
+        if staycation not in self._staycations:
+            return False
+        self._staycations.remove(staycation)
+        staycation.remove_listener(self._cost_changed)
+        self._index.remove(staycation)
+        hotel = self._hotels[staycation.hotel_name]
+        hotel.remove(staycation)
+        if not hotel:
+            del self._hotels[staycation.hotel_name]
+        return True
+
+    def _cost_changed(self, staycation, old_cost):
+        """Listener moving a staycation to the place of its new cost"""
+
+        old_price = old_cost / staycation.nights
+        for index in (self._index, self._hotels[staycation.hotel_name]):
+            index.remove(staycation, old_price)
+            index.insert(staycation)
+
+    def cheapest(self, k=1, hotel_name=None):
+        """Return the `k` cheapest staycations per night, of all hotels or of
+        `hotel_name`, cheapest first.
+        """
+
+        index = self._index if hotel_name is None else self._hotels.get(hotel_name)
+        return index.cheapest(k) if index else []
+
+    def price_range(self, low, high, hotel_name=None, limit=None):
+        """Return the staycations costing from `low` to `high` per night, of
+        all hotels or of `hotel_name`, cheapest first, up to `limit` of them.
+        """
+
+        index = self._index if hotel_name is None else self._hotels.get(hotel_name)
+        return index.price_range(low, high, limit) if index else []
+
+    def hotel(self, hotel_name):
+        """Return the staycations of `hotel_name`, cheapest per night first"""
+
+        return self.cheapest(len(self), hotel_name)
+
+    def hotel_names(self):
+        """Return the names of the hotels in the catalogue"""
+
+        return list(self._hotels)
+
+
 # Q1(c)
 class Booking:
     """A class to represent booking information for a staycation by a customer.
@@ -309,6 +555,281 @@ class Booking:
         )
 
 
+class BookingCalendar:
+    """A class to represent the bookings of each hotel over time.
+
+    A hotel's bookings may not overlap: a booking occupies its hotel from
+    the night of its check in date up to the night before its check out
+    date. Each hotel's bookings are kept sorted by check in date, with their
+    check in and check out days as ordinals alongside, so a new booking is
+    checked against its neighbours by bisection in O(log n). The number of
+    bookings staying each night is counted as bookings are added, so the
+    occupancy of a night is a lookup.
+
+    Example:
+        >>> calendar = BookingCalendar()
+        >>> calendar.add(Booking(customer, staycation, datetime(2021, 6, 30)))
+        >>> calendar.staying_on(datetime(2021, 7, 1))
+
+    """
+
+    def __init__(self):
+        """The `__init__` method initialises three attributes."""
+
+        # :dict: (check in ordinals, check out ordinals, bookings) of each
+        # hotel, sorted by check in, with key as `hotel_name`
+        self._hotels = {}
+        # :dict: number of bookings staying each night, with key as the
+        # night's date ordinal
+        self._nightly = {}
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    @staticmethod
+    def _days(booking):
+        """Return the check in and check out days of `booking` as ordinals"""
+
+        check_in = booking.check_in_date.toordinal()
+        return check_in, check_in + booking.staycation.nights
+
+    def _overlapping(self, hotel_name, check_in, check_out):
+        """Return the position at which bookings from day `check_in` to day
+        `check_out` would go in the hotel's calendar, and the bookings they
+        overlap.
+        """
+
+        check_ins, check_outs, bookings = self._hotels.get(hotel_name, ((), (), ()))
+        position = bisect_left(check_ins, check_in)
+        start = position
+        # bookings are disjoint, so only the one before may reach past `check_in`
+        if start and check_outs[start - 1] > check_in:
+            start -= 1
+        end = bisect_left(check_ins, check_out, position)
+        return position, list(bookings[start:end])
+
+    def overlapping(self, hotel_name, check_in_date, nights):
+        """Return the bookings of `hotel_name` overlapping a stay of `nights`
+        from `check_in_date`, in order of check in.
+        """
+
+        check_in = check_in_date.toordinal()
+        return self._overlapping(hotel_name, check_in, check_in + nights)[1]
+
+    def is_available(self, hotel_name, check_in_date, nights):
+        """Return True if `hotel_name` has no booking overlapping a stay of
+        `nights` from `check_in_date`.
+        """
+
+        return not self.overlapping(hotel_name, check_in_date, nights)
+
+    def add(self, booking):
+        """Add `booking` to the calendar of its hotel.
+
+        Raises:
+            BookingException: If the booking overlaps another booking of the
+                hotel.
+
+        """
+
+        check_in, check_out = self._days(booking)
+        hotel_name = booking.hotel_name()
+        position, overlapping = self._overlapping(hotel_name, check_in, check_out)
+        if overlapping:
+            other = overlapping[0]
+            raise BookingException(
+                f"{hotel_name} is booked from "
+                f"{other.check_in_date.strftime('%d %b %Y')} to "
+                f"{other.check_out_date().strftime('%d %b %Y')}"
+            )
+
+        check_ins, check_outs, bookings = self._hotels.setdefault(
+            hotel_name, ([], [], [])
+        )
+        check_ins.insert(position, check_in)
+        check_outs.insert(position, check_out)
+        bookings.insert(position, booking)
+        for night in range(check_in, check_out):
+            self._nightly[night] = self._nightly.get(night, 0) + 1
+        self._length += 1
+
+    def remove(self, booking):
+        """Remove `booking` from the calendar, if in it"""
+
+        check_in, check_out = self._days(booking)
+        hotel_name = booking.hotel_name()
+        check_ins, check_outs, bookings = self._hotels.get(hotel_name, ((), (), ()))
+        position = bisect_left(check_ins, check_in)
+        if position == len(bookings) or bookings[position] is not booking:
+            return False
+
+        del check_ins[position]
+        del check_outs[position]
+        del bookings[position]
+        if not bookings:
+            del self._hotels[hotel_name]
+        for night in range(check_in, check_out):
+            if self._nightly[night] == 1:
+                del self._nightly[night]
+            else:
+                self._nightly[night] -= 1
+        self._length -= 1
+        return True
+
+    def staying_on(self, date, hotel_name=None):
+        """Return the bookings staying the night of `date`, at `hotel_name`
+        or at every hotel.
+        """
+
+        night = date.toordinal()
+        hotel_names = self._hotels if hotel_name is None else (hotel_name,)
+        staying = []
+        for name in hotel_names:
+            check_ins, check_outs, bookings = self._hotels.get(name, ((), (), ()))
+            # the booking checked in last on or before the night, if any
+            position = bisect_right(check_ins, night) - 1
+            if position >= 0 and check_outs[position] > night:
+                staying.append(bookings[position])
+        return staying
+
+    def occupancy(self, date):
+        """Return the number of bookings staying the night of `date`"""
+
+        return self._nightly.get(date.toordinal(), 0)
+
+    def nightly_occupancy(self, start_date, end_date):
+        """Return the number of bookings staying each night from
+        `start_date` up to, not including, `end_date`.
+
+        Returns:
+            occupancy (dict): Number of bookings, with key as date.
+
+        """
+
+        start = start_date.toordinal()
+        return {
+            start_date + timedelta(days=offset): self._nightly.get(start + offset, 0)
+            for offset in range(end_date.toordinal() - start)
+        }
+
+
+class BookingRegistry:
+    """A class to represent the bookings of each staycation, for repricing.
+
+    Each staycation's bookings are listed with their costs at booking packed
+    alongside in an `array('d')`, so the cost differences of a staycation's
+    bookings are computed from the array in one pass, without reading each
+    Booking, and repricing only visits the bookings of the staycations
+    repriced.
+
+    Example:
+        >>> registry = BookingRegistry()
+        >>> registry.add(Booking(customer, staycation, datetime(2021, 6, 30)))
+        >>> registry.reprice({staycation: 438.00})
+        [(<Booking>, 40.0)]
+
+    """
+
+    def __init__(self):
+        """The `__init__` method initialises two attributes."""
+
+        # :dict: (bookings, costs at booking) of each staycation, with key as
+        # the Staycation
+        self._bookings = {}
+        # :dict: position of each booking in its staycation's lists, with key
+        # as the Booking
+        self._positions = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def add(self, booking):
+        """Add `booking` to the bookings of its staycation, if not already in"""
+
+        if booking in self._positions:
+            return False
+        bookings, costs = self._bookings.setdefault(
+            booking.staycation, ([], array("d"))
+        )
+        self._positions[booking] = len(bookings)
+        bookings.append(booking)
+        costs.append(booking.cost)
+        return True
+
+    def remove(self, booking):
+        """Remove `booking` from the bookings of its staycation, if in"""
+
+        position = self._positions.pop(booking, None)
+        if position is None:
+            return False
+        bookings, costs = self._bookings[booking.staycation]
+        # the last booking takes the place of the one removed
+        last = bookings.pop()
+        last_cost = costs.pop()
+        if last is not booking:
+            bookings[position] = last
+            costs[position] = last_cost
+            self._positions[last] = position
+        if not bookings:
+            del self._bookings[booking.staycation]
+        return True
+
+    def bookings_for(self, staycation):
+        """Return the bookings of `staycation`"""
+
+        return list(self._bookings.get(staycation, ((), ()))[0])
+
+    def _differences(self, staycation):
+        """Return (booking, cost difference) for the bookings of `staycation`"""
+
+        bookings, costs = self._bookings.get(staycation, ((), ()))
+        return zip(bookings, map(staycation.cost.__sub__, costs))
+
+    def reprice(self, new_costs):
+        """Set the cost of many staycations, and report the cost difference of
+        each of their bookings.
+
+        Args:
+            new_costs (dict): New cost of each staycation, with key as the
+                Staycation.
+
+        Returns:
+            differences (list): (booking, cost difference) for each booking
+                of the staycations repriced, as `cost_difference_from_current`
+                would give.
+
+        """
+
+        differences = []
+        for staycation, new_cost in new_costs.items():
+            staycation.cost = new_cost
+            differences.extend(self._differences(staycation))
+        return differences
+
+    def cost_differences(self, staycations=None):
+        """Report the bookings whose staycation's cost changed since booking.
+
+        Args:
+            staycations (iterable): Staycations to report on, default to
+                [None] for every staycation booked.
+
+        Returns:
+            differences (list): (booking, cost difference) for each booking
+                whose cost difference is not 0.
+
+        """
+
+        if staycations is None:
+            staycations = self._bookings
+        return [
+            (booking, difference)
+            for staycation in staycations
+            for booking, difference in self._differences(staycation)
+            if difference
+        ]
+
+
 def main():
     # Q1(d)(i)
     print("Creating Customer object...\n")
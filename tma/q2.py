@@ -8,21 +8,39 @@ Created on 31 Mar 2021.
 """
 
 
+import threading
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+import clock
+import policy
+
+
+@lru_cache(maxsize=65536)
+def _admin_charge(active_policy, item_type, year_published, cost, current_year):
+    """Return the admin charge of an item under `active_policy`, memoised per
+    (year_published, cost, current_year), so that items sharing these values
+    are only computed once per policy and year.
+    """
+
+    return active_policy.admin_charge(item_type, cost, current_year - year_published)
 
 
 # Q2(A)
 class Item(ABC):
     """An abstract superclass to represent one item in a library.
 
-    Attributes:
-        LOAN_DURATION (int): Loan duration for an item in the library,
-            default to [14].
+    The loan duration, fines and admin charges of each item type are rules
+    of the active loan policy (see `policy.DEFAULT_RULES`), the loan
+    duration of an item defaulting to [14] days.
+
+    Items, copies and loans are held in large numbers, so these classes
+    declare `__slots__` instead of carrying a per-instance `__dict__`.
 
     """
 
-    _LOAN_DURATION = 14
+    __slots__ = ("_title", "_year_published", "_cost")
 
     def __init__(self, title, year_published, cost):
         """The `__init__` method initialises three attributes.
@@ -73,15 +91,15 @@ class Item(ABC):
 
     @classmethod
     def get_loan_duration(cls):
-        """Return the class's `LOAN_DURATION` for items in a library"""
+        """Return the policy's loan duration for the class's items"""
 
-        return cls._LOAN_DURATION
+        return policy.current().loan_duration(None, cls)
 
     @classmethod
     def set_loan_duration(cls, new_duration):
-        """Set the new `LOAN_DURATION` for items in a library"""
+        """Set the policy's loan duration for the class's items"""
 
-        cls._LOAN_DURATION = int(new_duration)
+        policy.update({"items": {cls.__name__: {"loan_duration": int(new_duration)}}})
 
     @abstractmethod
     def get_admin_charge(self):
@@ -121,6 +139,8 @@ class Book(Item):
 
     """
 
+    __slots__ = ("_authors",)
+
     def __init__(self, title, year_published, cost, authors):
         """The `__init__` method initialises four instance attributes.
 
@@ -135,13 +155,24 @@ class Book(Item):
         super().__init__(title, year_published, cost)
         self._authors = authors
 
+    @property
+    def authors(self):
+        """Authors of the book.
+
+        :getter: Return the names of the book's authors
+        :rtype: list
+
+        """
+
+        return self._authors
+
     def get_admin_charge(self):
         """Compute the adminstrative charges based on the year of published.
 
         The adminstrative charges is determined based on the year of publishing,
-        where if the book is older than 9 years from today's date (year), it is
-        set at a constant rate of 10%. Meanwhile if the book is relatively new,
-        the adminstrative charges is computed based on:
+        where under the default policy, if the book is older than 9 years from
+        today's date (year), it is set at a constant rate of 10%. Meanwhile if
+        the book is relatively new, the adminstrative charges is computed based on:
 
             admin_rate = (10 - (`this_year` - `year_published`)) / 10
 
@@ -150,17 +181,19 @@ class Book(Item):
 
         """
 
-        year_diff_from_curr = datetime.now().year - self._year_published
-        # Books older than 9 years since year published has a fixed rate of 10%
-        if year_diff_from_curr > 9:
-            return 0.10 * self._cost
-        else:
-            return ((10 - year_diff_from_curr) / 10) * self._cost
+        # `clock.current_year()` is cached, and not read from the system time
+        return _admin_charge(
+            policy.current(),
+            type(self),
+            self._year_published,
+            self._cost,
+            clock.current_year(),
+        )
 
     def get_fines_per_day(self):
         """Return the fines per day for exceeding the due date"""
 
-        return 0.25
+        return policy.current().fines_per_day(type(self))
 
     def __str__(self):
         """String representation of a Book object."""
@@ -176,28 +209,32 @@ class Media(Item):
     The Media class does not defined its own constructor but inherit from the
     parent Item class.
 
-    Attributes:
-        loan_duration: The loan duration set for media item,
-            default to [3].
+    Under the default policy, media are lent for [3] days.
 
     Examples:
         >>> media = Media('ICT162', 2019, 19.90)
 
     """
 
-    _LOAN_DURATION = 3
+    __slots__ = ()
 
     def get_admin_charge(self):
         """Compute adminstrative charge, which is set at 1.5x of the cost price
-        for Media class.
+        for Media class under the default policy.
         """
 
-        return 1.5 * self._cost
+        return _admin_charge(
+            policy.current(),
+            type(self),
+            self._year_published,
+            self._cost,
+            clock.current_year(),
+        )
 
     def get_fines_per_day(self):
         """Return the fines per day for exceeding the due date"""
 
-        return 2.50
+        return policy.current().fines_per_day(type(self))
 
 
 # Q2(C)
@@ -212,6 +249,10 @@ class ItemCopy:
             starting from 1 and auto-increasing with each new `ItemCopy`
             instantiated.
 
+    Copies may be borrowed from several threads. Availability changes are
+    serialised by one of a fixed set of striped locks, chosen by copy id,
+    so that copies do not need a lock object each.
+
     Example:
         >>> book = Book('ICT162', 2019, 19.90, ['SUSS'])
         >>> media = Media('ICT162', 2019, 19.90)
@@ -220,23 +261,49 @@ class ItemCopy:
 
     """
 
+    __slots__ = (
+        "_item",
+        "_copy_id",
+        "_available",
+        "_reserved_for",
+        "_listeners",
+        "_str_cache",
+    )
+
     _NEXT_ID = 1
+    _ID_LOCK = threading.Lock()
+    _LOCKS = tuple(threading.Lock() for _ in range(64))
 
-    def __init__(self, item):
-        """The `__init__` method initialises four attributes.
+    def __init__(self, item, copy_id=None):
+        """The `__init__` method initialises six attributes.
 
         Args:
             item (Item): Item that exist in the library's collection
+            copy_id (int): Id of a copy replicated from another library,
+                default to [None] for the next id.
 
         """
 
         self._item = item
-        # :int: Each item copy has a unique copy id upon instantiating
-        self._copy_id = self._NEXT_ID
+        with ItemCopy._ID_LOCK:
+            if copy_id is None:
+                # :int: Each item copy has a unique copy id upon instantiating
+                self._copy_id = self._NEXT_ID
+                # Increase next_id by 1, everytime we instantiate a ItemCopy instance
+                type(self)._NEXT_ID += 1
+            else:
+                self._copy_id = copy_id
+                # ids assigned later must not collide with the given id
+                ItemCopy._NEXT_ID = max(ItemCopy._NEXT_ID, copy_id + 1)
         # :bool: True when no one borrowed, False if otherwise.
         self._available = True
-        # Increase next_id by 1, everytime we instantiate a ItemCopy instance
-        type(self)._NEXT_ID += 1
+        # :Member: member the available copy is held for, default to [None]
+        self._reserved_for = None
+        # :tuple: callbacks notified with this copy when availability changes,
+        # the shared empty tuple until a listener is added
+        self._listeners = ()
+        # :str: rendered `__str__`, None until rendered or after a change
+        self._str_cache = None
 
     @property
     def item(self):
@@ -275,14 +342,102 @@ class ItemCopy:
 
     @available.setter
     def available(self, status):
+        with self._lock():
+            self._set_available(status)
+
+    @property
+    def reserved_for(self):
+        """Member the copy is held for, who alone may borrow it while held.
+
+        :getter: Return the member the copy is held for, None if not held
+        :rtype: Member
+
+        """
+
+        return self._reserved_for
+
+    def hold_for(self, member):
+        """Hold the copy for `member`, or stop holding it if None.
+
+        Called from availability listeners, which run while the copy's lock
+        is held, so that the copy is held before anyone else can take it.
+
+        """
+
+        self._reserved_for = member
+
+    def _lock(self):
+        """Return the striped lock guarding this copy's availability"""
+
+        return ItemCopy._LOCKS[self._copy_id % len(ItemCopy._LOCKS)]
+
+    def _set_available(self, status):
+        """Set availability and notify listeners, the caller holds `_lock()`"""
+
+        changed = status != self._available
         self._available = status
+        if changed:
+            self._str_cache = None
+            for listener in self._listeners:
+                listener(self)
+
+    def try_reserve(self, member=None):
+        """Atomically mark the copy as unavailable if it is available, and
+        not held for anyone other than `member`.
+
+        Returns:
+            (bool): True if this call took the copy, False if it was already
+                unavailable or held for another member.
+
+        """
+
+        with self._lock():
+            if not self._available:
+                return False
+            if self._reserved_for is not None and self._reserved_for is not member:
+                return False
+            # Listeners see who the copy was held for, before it is cleared
+            self._set_available(False)
+            self._reserved_for = None
+            return True
+
+    def offer(self):
+        """Stop holding the copy for anyone, and notify listeners again if it
+        is available, so that they can hold it for the next member waiting.
+        """
+
+        with self._lock():
+            self._reserved_for = None
+            if self._available:
+                for listener in self._listeners:
+                    listener(self)
+
+    def add_listener(self, listener):
+        """Register a callable that is called with this copy whenever its
+        availability changes (e.g. when a `Loan` is made or returned).
+        """
+
+        self._listeners += (listener,)
 
     def __str__(self):
-        """String representation of an ItemCopy object."""
+        """String representation of an ItemCopy object, cached until the
+        availability changes (the item itself is not modified once created).
+        """
 
-        return (
-            f"CopyId: {self._copy_id} " f"{self._item} " f"Available: {self._available}"
-        )
+        rendered = self._str_cache
+        if rendered is None:
+            # rendered and stored under the lock availability changes take,
+            # so a change cannot clear the cache before a stale string is
+            # stored (not to be called from availability listeners)
+            with self._lock():
+                if self._str_cache is None:
+                    self._str_cache = (
+                        f"CopyId: {self._copy_id} "
+                        f"{self._item} "
+                        f"Available: {self._available}"
+                    )
+                rendered = self._str_cache
+        return rendered
 
 
 # Q2(D)
@@ -296,25 +451,69 @@ class Loan:
 
     """
 
-    def __init__(self, item_copy, loan_date):
-        """The `__init__` method initialises three instance attributes.
+    __slots__ = (
+        "_item_copy",
+        "_loan_date",
+        "_due_date",
+        "_return_date",
+        "_renewals",
+        "_fines_per_day",
+        "_str_cache",
+    )
+
+    def __init__(self, item_copy, loan_date, duration=None):
+        """The `__init__` method initialises seven instance attributes.
 
         Args:
             item_copy (ItemCopy): The copy of the item that a loan is made for
             loan_date (datetime): Date of the loan occured, used to compute the `due_date`,
                 where `due_date` = `loan_date` + `Item.get_loan_duration()`
+            duration (int): Loan duration in days, default to [None] for
+                `Item.get_loan_duration()`
 
         """
 
         self._item_copy = item_copy
+        self._loan_date = loan_date
         # `due_date` = `loan_date` +  `Item.get_loan_duration()`
-        # loan duration based on item type preset duration
-        self._due_date = loan_date + timedelta(days=item_copy.item.get_loan_duration())
+        # loan duration based on item type preset duration, unless given
+        if duration is None:
+            duration = item_copy.item.get_loan_duration()
+        self._due_date = loan_date + timedelta(days=duration)
         # :datetime:  Return date of the loan, default to [None].
         self._return_date = None
+        # :int: Number of times the loan was renewed
+        self._renewals = 0
+        # :float: Fines per day charged, the rate in force when the loan was
+        # returned, None until then
+        self._fines_per_day = None
+        # :str: rendered `__str__`, None until rendered or after a change
+        self._str_cache = None
         # Setting borrowed item copy to unavailable
         item_copy.available = False
 
+    @property
+    def loan_date(self):
+        """The date the loan was made.
+
+        :getter: Returns the date the copy of the item was borrowed
+        :rtype: datetime
+
+        """
+
+        return self._loan_date
+
+    @property
+    def renewals(self):
+        """Number of times the loan was renewed.
+
+        :getter: Returns the number of successful renewals of the loan
+        :rtype: int
+
+        """
+
+        return self._renewals
+
     @property
     def due_date(self):
         """The date of which the loan must be returned before fines are incurred.
@@ -348,10 +547,31 @@ class Loan:
 
     @return_date.setter
     def return_date(self, return_date):
-        """Beside setting the return date, availability will be set to True"""
+        """Beside setting the return date, availability will be set to True,
+        and the fines per day in force are kept as the rate charged.
+        """
 
         self._item_copy.available = True
         self._return_date = return_date
+        self._fines_per_day = self._item_copy.item.get_fines_per_day()
+        self._str_cache = None
+
+    @property
+    def fines_per_day(self):
+        """Fines per day charged for the loan, fixed when it is returned so
+        that a later change of policy does not change its fines.
+
+        :getter: Returns the rate charged, None if the loan has not been returned
+        :setter: Set the rate charged, e.g. the rate journalled with the return
+        :rtype: float
+
+        """
+
+        return self._fines_per_day
+
+    @fines_per_day.setter
+    def fines_per_day(self, fines_per_day):
+        self._fines_per_day = fines_per_day
 
     def loan_title(self):
         """Returns the title of the loaned copy of the item."""
@@ -363,7 +583,19 @@ class Loan:
 
         return self._item_copy.copy_id
 
-    def renew(self, renew_date):
+    def item(self):
+        """Returns the item of the loaned copy."""
+
+        return self._item_copy.item
+
+    def return_datetime(self):
+        """Returns the return date of the loan as a datetime, None if the loan
+        has not been returned.
+        """
+
+        return self._return_date
+
+    def renew(self, renew_date, duration=None):
         """Extend the due date of the loan provided that the renewal date,
         is on or before the current due date.
 
@@ -375,6 +607,8 @@ class Loan:
 
         Args:
             renew_date (datetime): The date of which the renewal was requested.
+            duration (int): Days the loan is extended by, default to [None]
+                for `Item.get_loan_duration()`
 
         Returns:
             (bool) True if renewal is successful, False if otherwise.
@@ -382,7 +616,11 @@ class Loan:
         """
 
         if renew_date <= self._due_date:  # before up to the actual due date
-            self._due_date += timedelta(days=self._item_copy.item.get_loan_duration())
+            if duration is None:
+                duration = self._item_copy.item.get_loan_duration()
+            self._due_date += timedelta(days=duration)
+            self._renewals += 1
+            self._str_cache = None
             return True  # if renewal succesful
         return False  # if renewal unsucessful
 
@@ -391,7 +629,9 @@ class Loan:
         the due date. The fines are only computed when the loan is returned.
 
         The computation:
-            fines = days_exceed * `Item.get_fines_per_day()`
+            fines = days_exceed * `fines_per_day`
+
+        where `fines_per_day` is the item's rate when the loan was returned.
 
         If the loan has not been returned, the fines will be returned as -1.
 
@@ -414,7 +654,7 @@ class Loan:
             # Loan not returned on time (`due_date` == `return_date`)
             if days_exceed:
                 # fine per day exceed * days exceeded
-                fines = days_exceed.days * self._item_copy.item.get_fines_per_day()
+                fines = days_exceed.days * self._fines_per_day
             else:
                 fines = 0
 
@@ -429,7 +669,12 @@ class Loan:
         return self._item_copy.item.lost_charges()
 
     def __str__(self):
-        """String representation of a Loan object."""
+        """String representation of a Loan object, cached until the loan is
+        renewed or returned.
+        """
+
+        if self._str_cache is not None:
+            return self._str_cache
 
         copy_id = self._item_copy.copy_id
         title = self._item_copy.item.title
@@ -440,11 +685,12 @@ class Loan:
             else "On Loan"
         )
 
-        return (
+        self._str_cache = (
             f"Loan Copy id: {copy_id} {title}"
             f"\n\t Due date: {due_date} "
             f"Return on: {return_date}"
         )
+        return self._str_cache
 
 
 def main():
@@ -8,8 +8,23 @@ Created on 01 Apr 2021
 """
 
 
+import heapq
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from collections import deque
 from datetime import datetime
+from functools import wraps
+import clock
+import policy
 from q2 import Book, Media, Loan, ItemCopy
+from ledger import FINE, PAYMENT, Ledger, to_cents, to_dollars
+from title_index import TitleIndex, normalise
+
+
+# Debug mode, enabled by setting the LIBRARY_DEBUG environment variable,
+# checks incrementally maintained state against a full recomputation
+DEBUG = bool(os.environ.get("LIBRARY_DEBUG"))
 
 
 # Q3(A)
@@ -46,6 +61,19 @@ class LibraryPaymentException(LibraryException):
         return self._amount
 
 
+def _synchronised(method):
+    """Decorator running a Member method while holding the member's lock,
+    so that one member can be served safely from several threads.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 # Q3(B)(i)
 class Member:
     """A class to represent a member of the Library
@@ -53,18 +81,16 @@ class Member:
     The member class details the member's id, name, fines owed and loans that
     were made by the member.
 
-    Attributes:
-        LOAN_QUOTA (int): The loan quota for a standard member, default to [4].
+    The loan quota of each member type is a rule of the active loan policy
+    (see `policy.DEFAULT_RULES`), default to [4] for a standard member.
 
     Example:
         >>> member = Member('S101', 'Jensen')
 
     """
 
-    _LOAN_QUOTA = 4
-
     def __init__(self, member_id, name):
-        """The `__init__` method initialises four instance attributes.
+        """The `__init__` method initialises nine instance attributes.
 
         Args:
             member_id (str): Id assigned to the member.
@@ -74,16 +100,77 @@ class Member:
 
         self._member_id = member_id
         self._name = name
-        # :float: the amount owed by the member due to late loan returns
-        self._amount_owed = 0
+        # :Ledger: fines and payments of the member, the amount owed being
+        # its balance
+        self._ledger = Ledger()
         # :list: a list of loans by the member
         self._loans = []
+        # :dict: unreturned loans, keyed by normalised title (see `_title_key`)
+        self._open_loans = {}
+        # :dict: returned loans in order of return, keyed by normalised title
+        self._closed_loans = {}
+        # :int: number of unreturned loans, kept in step with `_open_loans`
+        self._open_loan_count = 0
+        # :RLock: guards the member's loans and amount owed across threads
+        self._lock = threading.RLock()
+        # :list: callbacks notified as `listener(member, event, loan, date,
+        # amount)` after a successful 'borrow', 'renew', 'return' or 'pay',
+        # with the date of the operation, and the fines incurred by a return
+        # or the amount paid (loan None)
+        self._listeners = []
+
+    def __getstate__(self):
+        """Pickle the member without its lock"""
+
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        """Restore a pickled member with a new lock"""
+
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        # members pickled when loans were keyed by `str.lower` have their
+        # loans of titles differing only in spacing or case fold merged
+        for index, order in (
+            (self._open_loans, Loan.loan_date.fget),
+            (self._closed_loans, Loan.return_datetime),
+        ):
+            for key in [key for key in index if key != self._title_key(key)]:
+                loans = index.setdefault(self._title_key(key), [])
+                loans.extend(index.pop(key))
+                loans.sort(key=order)
+
+    @staticmethod
+    def _title_key(title):
+        """Return the normalised title used to key the member's loan index,
+        the same as the library's title lookups
+        """
+
+        return normalise(title)
+
+    def add_listener(self, listener):
+        """Register a callable notified of the member's loan changes"""
+
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Unregister a callable added with `add_listener`"""
+
+        self._listeners.remove(listener)
+
+    def _notify(self, event, loan, date, amount=0.0):
+        """Notify listeners that `event` happened to `loan` on `date`"""
+
+        for listener in self._listeners:
+            listener(self, event, loan, date, amount)
 
     @classmethod
     def get_loan_quota(cls):
-        """Return the loan quota set for the member class"""
+        """Return the policy's loan quota for the member class"""
 
-        return cls._LOAN_QUOTA
+        return policy.current().loan_quota(cls)
 
     @property
     def member_id(self):
@@ -104,7 +191,25 @@ class Member:
         :rtype: float
 
         """
-        return self._amount_owed
+        return to_dollars(self._ledger.balance)
+
+    @property
+    def ledger(self):
+        """The fines and payments recorded for the member
+
+        :getter: Return the member's ledger, with amounts in cents
+        :rtype: Ledger
+
+        """
+
+        return self._ledger
+
+    def amount_owed_as_of(self, date):
+        """Return the amount owed by the member after the fines and payments
+        dated up to `date`.
+        """
+
+        return to_dollars(self._ledger.balance_as_of(date))
 
     def past_loans(self, title=None):
         """Return a list of returned loans.
@@ -120,15 +225,9 @@ class Member:
 
         """
 
-        past_loans = []
-        # if title is supplied
+        # if title is supplied, look up the returned loans from the index
         if title:
-            for loan in self._loans:
-                # check for matching title in loans and return date available
-                if (loan.loan_title().lower() == title.lower()) and (
-                    loan.return_date is not None
-                ):
-                    past_loans.append(loan)
+            past_loans = list(self._closed_loans.get(self._title_key(title), []))
         # no title is supplied
         else:
             # check for loan with return date
@@ -149,14 +248,9 @@ class Member:
             present_loans (list): A list of present loans with matching titles.
 
         """
-        present_loans = []
-        # if title is supplied
+        # if title is supplied, look up the unreturned loans from the index
         if title:
-            for loan in self._loans:
-                if (loan.loan_title().lower() == title.lower()) and (
-                    loan.return_date is None
-                ):
-                    present_loans.append(loan)
+            present_loans = list(self._open_loans.get(self._title_key(title), []))
         # no title is supplied
         else:
             # check for the loan with no return date
@@ -164,6 +258,11 @@ class Member:
 
         return present_loans
 
+    def loans(self):
+        """Return a list of all loans of the member, in order of borrowing"""
+
+        return list(self._loans)
+
     def search_loan_for(self, title):
         """Return the first unreturned loan with a matching title.
 
@@ -181,30 +280,50 @@ class Member:
         """
 
         loan = None
-        unreturned_loans = self.present_loans(title)
-        returned_loans = self.past_loans(title)
+        key = self._title_key(title)
+        unreturned_loans = self._open_loans.get(key)
+        returned_loans = self._closed_loans.get(key)
 
         if unreturned_loans:
             # Return first unreturned loan
             loan = unreturned_loans[0]
         elif returned_loans:
-            # sort the returned loan by date and return the last matched item
-            returned_loans.sort(key=lambda loan: loan.return_date, reverse=True)
-            # last returned matched item (latest date)
-            loan = returned_loans[0]
+            # returned loans are kept in order of return, last one is the latest
+            loan = returned_loans[-1]
 
         return loan
 
     def count_current_loan(self):
-        """Count the number of unreturned items loaned."""
+        """Count the number of unreturned items loaned, in O(1).
+
+        In debug mode, the count is checked against a scan of all loans.
+
+        """
 
-        return len(self.present_loans())
+        if DEBUG:
+            self._check_open_loan_count()
+        return self._open_loan_count
+
+    def _check_open_loan_count(self):
+        """Raise AssertionError if the open loan count disagrees with the
+        loans and the open loan index.
+        """
+
+        scanned = sum(1 for loan in self._loans if loan.return_datetime() is None)
+        indexed = sum(len(loans) for loans in self._open_loans.values())
+        if not self._open_loan_count == scanned == indexed:
+            raise AssertionError(
+                f"Member {self._member_id} open loan count "
+                f"{self._open_loan_count} disagrees with {scanned} unreturned "
+                f"loans ({indexed} indexed)"
+            )
 
     def quota_reached(self):
         """Return True if current loan number reached quota, False otherwise."""
 
-        return self.count_current_loan() == type(self)._LOAN_QUOTA
+        return self.count_current_loan() >= self.get_loan_quota()
 
+    @_synchronised
     def borrow_item(self, item_copy, date_borrowed):
         """Method to allow a member to borrow a copy of an item, thereafter
         becoming a loan `Loan`.
@@ -220,30 +339,45 @@ class Member:
             (bool): Indicate whether the loan of the item copy was successful.
 
         Raises:
-            LibraryException: Item copy is unavailable or loan quota is reached.
+            LibraryException: Item copy is unavailable or held for another
+                member, or loan quota is reached.
             LibraryPaymentException: If member has an existing fine unpaid.
 
         """
         # `item_copy` is already borrowed out (unavailable)
         if not item_copy.available:
             raise LibraryException(f"Unavailable: {item_copy}")
+        # `item_copy` is held for another member
+        if item_copy.reserved_for not in (None, self):
+            raise LibraryException(f"On hold for another member: {item_copy}")
         # if member reached the loan quota for their member class
         if self.quota_reached():
             raise LibraryException("Loan quota has been reached")
         # if member has existing amount owed
-        if self._amount_owed > 0:
+        if self._ledger.balance > 0:
             raise LibraryPaymentException(
-                self._amount_owed,
-                f"You have ${self._amount_owed:.2f} "
+                self.amount_owed,
+                f"You have ${self.amount_owed:.2f} "
                 "outstanding fines. "
                 "Do you want wish to pay your fines now? (y/n): ",
             )
+        # taking the copy atomically, another member may have borrowed it since
+        if not item_copy.try_reserve(self):
+            raise LibraryException(f"Unavailable: {item_copy}")
 
-        loan = Loan(item_copy, date_borrowed)  # creating the loan
+        # creating the loan, for the policy's duration for this member type
+        duration = policy.current().loan_duration(type(self), type(item_copy.item))
+        loan = Loan(item_copy, date_borrowed, duration)
         self._loans.append(loan)  # adding to the member's loans
+        # indexing the loan as unreturned under its title
+        key = self._title_key(loan.loan_title())
+        self._open_loans.setdefault(key, []).append(loan)
+        self._open_loan_count += 1
+        self._notify("borrow", loan, date_borrowed)
 
         return True
 
+    @_synchronised
     def renew(self, title, renew_date):
         """Method to allow member to renew the due date of the loaned item
 
@@ -261,14 +395,12 @@ class Member:
         """
 
         matched_loans = self.search_loan_for(title)
-        past_loans = self.past_loans(title)
-        present_loans = self.present_loans(title)
 
         # if title of the item was never loaned
         if not matched_loans:
             raise LibraryException(f"There is no loan recorded for {title}")
         # if item copy is not a present loan but loaned previously
-        if (not present_loans) and past_loans:
+        if matched_loans.return_date is not None:
             raise LibraryException(
                 f"Item: {title} has been returned on {matched_loans.return_date}"
             )
@@ -280,11 +412,14 @@ class Member:
                 f"Date of renewal on {renew_date} exceed the existing due date on {due_date}"
             )
         # if no exception is raised, loan can be renewed
-        matched_loans.renew(renew_date)
+        duration = policy.current().loan_duration(type(self), type(matched_loans.item()))
+        matched_loans.renew(renew_date, duration)
+        self._notify("renew", matched_loans, renew_date)
 
         return True
 
-    def return_item(self, title, return_date):
+    @_synchronised
+    def return_item(self, title, return_date, fines_per_day=None):
         """Method to allow members to return the item that they loaned
 
         Upon returning the item, the fines is also recorded if any fines are
@@ -293,6 +428,8 @@ class Member:
         Args:
             title (str): The title of the item copy to be returned to the library.
             return_date (datetime): The date of each the loan is returned.
+            fines_per_day (float): Fines per day charged, default to [None]
+                for the rate of the current policy.
 
         Return:
             (bool): Indicate whether the loan item has been returned
@@ -304,31 +441,44 @@ class Member:
         """
 
         matched_loans = self.search_loan_for(title)
-        past_loans = self.past_loans(title)
-        present_loans = self.present_loans(title)
 
         # if title of the item was never loaned
         if not matched_loans:
             raise LibraryException(f"There is no loan recorded for {title}")
         # if item copy is not a present loan but loaned previously
-        if (not present_loans) and past_loans:
+        if matched_loans.return_date is not None:
             raise LibraryException(
                 f"Item has been returned on {matched_loans.return_date}"
             )
 
         matched_loans.return_date = return_date  # Update with return date
+        if fines_per_day is not None:
+            matched_loans.fines_per_day = fines_per_day
+        # moving the loan from the unreturned to the returned index
+        key = self._title_key(title)
+        open_loans = self._open_loans[key]
+        open_loans.pop(0)  # `matched_loans` is the first unreturned loan
+        if not open_loans:
+            del self._open_loans[key]
+        self._open_loan_count -= 1
+        self._closed_loans.setdefault(key, []).append(matched_loans)
         # obtaining fines incurred, if late, else $0 fines.
         fines_incurred = matched_loans.get_fines()
         if fines_incurred:
-            self._amount_owed += fines_incurred  # Fines added to `amount_owed`
+            # Fines added to the ledger, and so to `amount_owed`
+            self._ledger.record(return_date, to_cents(fines_incurred), FINE)
+        self._notify("return", matched_loans, return_date, fines_incurred)
 
         return True
 
-    def pay(self, amount):
+    @_synchronised
+    def pay(self, amount, date=None):
         """Method to allow members to pay their outstanding fines
 
         Args:
             amount (float): The amount the member is paying for their outstanding fines.
+            date (datetime): The date of the payment recorded in the ledger,
+                default to [None] for the current time of the `clock`.
 
         Returns:
             change (float): change if the amount paid exceed amount owed, default
@@ -337,6 +487,7 @@ class Member:
         Raises:
             LibraryPaymentException: If the amount chosen by the member for the
                 payment is less than 0.
+            ValueError: If the amount is infinite or NaN.
 
         """
 
@@ -344,16 +495,21 @@ class Member:
         if amount <= 0:
             raise LibraryPaymentException(
                 amount,
-                f"You owed ${self._amount_owed:.2f}. "
+                f"You owed ${self.amount_owed:.2f}. "
                 f"Please pay an amount that is more than $0",
             )
+        paid = to_cents(amount)
+        owed = self._ledger.balance
         # Change does not exists if you pay less than required
-        change = amount - self._amount_owed if amount > self._amount_owed else 0
+        change = paid - owed if paid > owed else 0
         # Maximum payable fines is exisitng outstanding fines
-        # Only payable until the `_amount_owed` == 0
-        self._amount_owed -= amount - change
+        # Only payable until the `amount_owed` == 0
+        if paid - change:
+            date = clock.current().now() if date is None else date
+            self._ledger.record(date, change - paid, PAYMENT)
+            self._notify("pay", None, date, to_dollars(paid - change))
 
-        return change
+        return to_dollars(change)
 
     def loan_str(self, loans=None):
         """String representation of the loans the member has, given no specific
@@ -377,21 +533,37 @@ class Member:
 
         return loan_str
 
+    def iter_lines(self):
+        """Yield the lines of the member's string representation on demand.
+
+        The loans are partitioned into past and present loans in a single
+        pass, and each loan's rendering is cached by the loan itself.
+
+        """
+
+        past_loans, present_loans = [], []
+        for loan in self._loans:
+            if loan.return_datetime() is None:
+                present_loans.append(loan)
+            else:
+                past_loans.append(loan)
+
+        yield ""
+        yield f"Id: {self._member_id} {self._name} Owed: ${self.amount_owed:.2f}"
+        yield "Past loans:"
+        if not past_loans:
+            yield "No past loans"
+        yield from (str(loan) for loan in past_loans)
+        yield "Present loans:"
+        if not present_loans:
+            yield "No outstanding loans"
+        yield from (str(loan) for loan in present_loans)
+        yield f"Outstanding loans: {len(present_loans)}"
+
     def __str__(self):
         """String representation of the Member object."""
 
-        amount_owed = self._amount_owed
-        past_loans = self.past_loans()
-        present_loans = self.present_loans()
-
-        return (
-            f"\nId: {self._member_id} {self._name} Owed: ${amount_owed:.2f}"
-            f"\nPast loans:"
-            f"\n{'No past loans' if not past_loans else self.loan_str(past_loans)}"
-            f"\nPresent loans:"
-            f"\n{'No outstanding loans' if not present_loans else self.loan_str(present_loans)}"
-            f"\nOutstanding loans: {self.count_current_loan()}"
-        )
+        return "\n".join(self.iter_lines())
 
 
 # Q3(B)(ii)
@@ -402,15 +574,250 @@ class JuniorMember(Member):
     The JuniorMember class does not defined its own constructor but inherit
     from the parent Member class.
 
-    Attributes:
-        LOAN_QUOTA (int): The loan quota for a junior member, default to [2].
+    Under the default policy, the loan quota for a junior member is [2].
 
     Examples:
         >>> junior_member = JuniorMember('S100', 'Jensen')
 
     """
 
-    _LOAN_QUOTA = 2
+
+class DueDateIndex:
+    """A min-heap of unreturned loans keyed by due date.
+
+    Entries are pushed when a loan is made or renewed. Entries made stale by
+    a renewal (the due date moved) or a return are skipped lazily when the
+    heap is read, and the heap is rebuilt once stale entries outnumber the
+    current ones.
+
+    Example:
+        >>> index = DueDateIndex()
+        >>> index.push(member, loan)
+        >>> index.overdue(datetime(2021, 3, 20))
+
+    """
+
+    def __init__(self):
+        """The `__init__` method initialises four instance attributes."""
+
+        # :list: heap of (due_date, sequence, member, loan) entries
+        self._heap = []
+        # :int: tie-breaker so that entries never compare members or loans
+        self._seq = 0
+        # :int: number of entries that are not stale
+        self._current = 0
+        # :Lock: members borrowing from several threads share the index
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        """Pickle the index without its lock"""
+
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        """Restore a pickled index with a new lock"""
+
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of unreturned loans indexed"""
+
+        return self._current
+
+    @staticmethod
+    def _is_current(entry):
+        """Return True if the entry's loan is unreturned and still due then"""
+
+        due_date, _, _, loan = entry
+        return loan.return_datetime() is None and loan.due_date == due_date
+
+    def push(self, member, loan):
+        """Index `loan` of `member` under its current due date"""
+
+        with self._lock:
+            self._seq += 1
+            heapq.heappush(self._heap, (loan.due_date, self._seq, member, loan))
+            self._current += 1
+
+    def discard(self):
+        """Record that one indexed entry went stale (a renewal or return)"""
+
+        with self._lock:
+            self._current -= 1
+            if len(self._heap) > 2 * self._current + 64:
+                self._heap = [entry for entry in self._heap if self._is_current(entry)]
+                heapq.heapify(self._heap)
+
+    def drop(self, member):
+        """Remove the entries of `member`, who is no longer registered.
+
+        The heap is rebuilt without them, and without any stale entries.
+
+        """
+
+        with self._lock:
+            self._heap = [
+                entry
+                for entry in self._heap
+                if entry[2] is not member and self._is_current(entry)
+            ]
+            heapq.heapify(self._heap)
+            self._current = len(self._heap)
+
+    def overdue(self, as_of):
+        """Return the unreturned loans that are due before `as_of`.
+
+        Only the part of the heap with due dates before `as_of` is visited,
+        so the cost depends on the number of results rather than the number
+        of loans.
+
+        Args:
+            as_of (datetime): The date to check the due dates against.
+
+        Returns:
+            overdue (list): (member, loan) tuples sorted by due date.
+
+        """
+
+        found = []
+        with self._lock:
+            heap = self._heap
+            pending = [0] if heap else []
+            while pending:
+                position = pending.pop()
+                entry = heap[position]
+                # Children are never due earlier than their parent
+                if entry[0] >= as_of:
+                    continue
+                if self._is_current(entry):
+                    found.append(entry)
+                pending.extend(
+                    child
+                    for child in (2 * position + 1, 2 * position + 2)
+                    if child < len(heap)
+                )
+
+        found.sort(key=lambda entry: entry[:2])
+        return [(member, loan) for _, _, member, loan in found]
+
+
+class CopyIdIndex:
+    """A class to represent a set of copy ids kept in ascending order.
+
+    Ids are kept in sorted chunks of at most `2 * LOAD` ids, with the highest
+    id of each chunk alongside. An id is located by bisecting the chunks'
+    highest ids, then within the chunk, so adding or discarding an id only
+    moves the ids of one chunk, and a page of ids after a given id is read
+    without visiting the ids before it.
+
+    Example:
+        >>> index = CopyIdIndex()
+        >>> index.add(3)
+        >>> index.add(1)
+        >>> index.page(after=1, page_size=20)
+        [3]
+
+    """
+
+    LOAD = 512
+
+    def __init__(self):
+        """The `__init__` method initialises four instance attributes."""
+
+        # :list: chunks of ids, each in ascending order
+        self._chunks = []
+        # :list: highest id of each chunk
+        self._maxes = []
+        self._length = 0
+        # :Lock: copies becoming available in several threads share the index
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        """Pickle the index without its lock"""
+
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        """Restore a pickled index with a new lock"""
+
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of ids indexed"""
+
+        return self._length
+
+    def __iter__(self):
+        """Iterate over the ids in ascending order"""
+
+        for chunk in list(self._chunks):
+            yield from list(chunk)
+
+    def add(self, copy_id):
+        """Add `copy_id`, if not already indexed"""
+
+        with self._lock:
+            if not self._maxes:
+                self._chunks.append([copy_id])
+                self._maxes.append(copy_id)
+                self._length += 1
+                return
+
+            index = min(bisect_left(self._maxes, copy_id), len(self._maxes) - 1)
+            chunk = self._chunks[index]
+            position = bisect_left(chunk, copy_id)
+            if position < len(chunk) and chunk[position] == copy_id:
+                return
+            chunk.insert(position, copy_id)
+            self._maxes[index] = chunk[-1]
+            self._length += 1
+
+            if len(chunk) > 2 * self.LOAD:  # split the chunk in two
+                self._chunks.insert(index + 1, chunk[self.LOAD :])
+                self._maxes.insert(index + 1, chunk[-1])
+                del chunk[self.LOAD :]
+                self._maxes[index] = chunk[-1]
+
+    def discard(self, copy_id):
+        """Remove `copy_id`, if indexed"""
+
+        with self._lock:
+            index = bisect_left(self._maxes, copy_id)
+            if index == len(self._maxes):
+                return
+            chunk = self._chunks[index]
+            position = bisect_left(chunk, copy_id)
+            if position == len(chunk) or chunk[position] != copy_id:
+                return
+            del chunk[position]
+            self._length -= 1
+            if chunk:
+                self._maxes[index] = chunk[-1]
+            else:
+                del self._chunks[index]
+                del self._maxes[index]
+
+    def page(self, after=0, page_size=20):
+        """Return up to `page_size` ids greater than `after`, ascending"""
+
+        page = []
+        with self._lock:
+            index = bisect_right(self._maxes, after)
+            if index == len(self._maxes):
+                return page
+            position = bisect_right(self._chunks[index], after)
+            while index < len(self._chunks) and len(page) < page_size:
+                chunk = self._chunks[index]
+                page.extend(chunk[position : position + page_size - len(page)])
+                index += 1
+                position = 0
+        return page
 
 
 # Q3(C)
@@ -426,7 +833,7 @@ class Library:
     """
 
     def __init__(self):
-        """The `__init__` method initialises three instance attributes."""
+        """The `__init__` method initialises fifteen instance attributes."""
 
         # :dict: A dictionary containing members, with key as `member_id`
         self._members = {}
@@ -434,33 +841,393 @@ class Library:
         self._items = {}
         # :dict: A collection of item copy based on items from `_items`
         self._copy_items = []
+        # :dict: Item copies from `_copy_items`, with key as `copy_id`
+        self._copy_index = {}
+        # :dict: Currently available item copies, with key as `copy_id`
+        self._available_copies = {}
+        # :CopyIdIndex: Copy ids of `_available_copies`, in ascending order
+        self._available_ids = CopyIdIndex()
+        # :DueDateIndex: Unreturned loans of registered members by due date
+        self._due_dates = DueDateIndex()
+        # :TitleIndex: Titles of `_items` for prefix and fuzzy lookup
+        self._title_index = TitleIndex()
+        # :dict: Books of `_items` by title, with key as normalised author name
+        self._author_items = {}
+        # :dict: Copies of each item from `_copy_items`, with key as 'title'
+        self._title_copies = {}
+        # :dict: FIFO queues of members waiting for an item, with key as 'title'
+        self._holds = {}
+        # :dict: Copies held for a member and not yet borrowed, with key as
+        # `member_id`
+        self._held_copies = {}
+        # :deque: (member, item_copy) holds made but not yet notified
+        self._hold_notices = deque()
+        # :list: callbacks notified as `listener(member, item_copy)` when a
+        # copy is held for a member
+        self._hold_listeners = []
+        # :list: callbacks notified as `listener(member, event, loan, date,
+        # amount)` of registered members' loan and payment events (see
+        # `Member`), and of 'register' and 'remove' (loan and date None)
+        self._change_listeners = []
+
+    def __getstate__(self):
+        """Pickle the library without its hold and change listeners, which
+        belong to the running application
+        """
+
+        state = self.__dict__.copy()
+        state["_hold_listeners"] = []
+        state["_change_listeners"] = []
+        state["_hold_notices"] = deque()
+        return state
 
     def add_item(self, item):
         """Add item to `_items` if item's title does not exist"""
 
         if item.title not in self._items.keys():
             self._items[item.title] = item
+            self._title_index.add(item.title)
+            if isinstance(item, Book):
+                for author in item.authors:
+                    books = self._author_items.setdefault(normalise(author), {})
+                    books[item.title] = item
             return True
         return False
 
-    def add_copy_item(self, item):
-        """Creates a copy item and adds to `_copy_items`"""
+    def search_item(self, title):
+        """Search an item based on `title` from `_items`"""
+
+        return self._items.get(title)
+
+    def search_items_by_authors(self, *authors):
+        """Search the books written by all of the given authors, ignoring case
 
-        copy_item = ItemCopy(item)
+        The books of each author are looked up in `_author_items`, and the
+        smallest of these collections is filtered against the others.
+
+        Returns:
+            items (list): Books co-authored by every author given.
+
+        """
+
+        collections = sorted(
+            (self._author_items.get(normalise(author), {}) for author in authors),
+            key=len,
+        )
+        if not collections:
+            return []
+
+        smallest, others = collections[0], collections[1:]
+        return [
+            item
+            for title, item in smallest.items()
+            if all(title in books for books in others)
+        ]
+
+    def search_titles(self, prefix, limit=10):
+        """Search up to `limit` item titles starting with `prefix`, ignoring case"""
+
+        return self._title_index.prefix(prefix, limit)
+
+    def suggest_titles(self, title, max_distance=2, limit=10):
+        """Search up to `limit` item titles within `max_distance` typing errors
+        of `title`, closest first.
+        """
+
+        return self._title_index.fuzzy(title, max_distance, limit)
+
+    def resolve_title(self, title):
+        """Return the item title that `title` refers to, tolerating case,
+        a partial title or typing errors, None if no single title matches.
+        """
+
+        return self._title_index.resolve(title)
+
+    def add_copy_item(self, item, copy_id=None):
+        """Creates a copy item and adds to `_copy_items`, with `copy_id` if
+        given.
+
+        Raises:
+            LibraryException: If a copy with `copy_id` already exists.
+
+        """
+
+        if copy_id in self._copy_index:
+            raise LibraryException(f"Copy id {copy_id} already exists")
+        copy_item = ItemCopy(item, copy_id)
         self._copy_items.append(copy_item)
+        self._copy_index[copy_item.copy_id] = copy_item
+        self._title_copies.setdefault(item.title, []).append(copy_item)
+        # the new copy goes to the first member waiting for the item, if any
+        self._update_availability(copy_item)
+        self._notify_holds()
+        # keep `_available_copies` in step with loans made and returned
+        copy_item.add_listener(self._update_availability)
+
+    def _update_availability(self, copy_item):
+        """Listener adding or removing `copy_item` from `_available_copies`
+
+        A copy becoming available is held for the first member waiting for
+        its item instead, if any. As the listener runs while the copy's lock
+        is held, no one else can take the copy first. Hold listeners are
+        notified later, by `_notify_holds`, once the lock is released.
+
+        """
+
+        holder = copy_item.reserved_for
+        if not copy_item.available:
+            self._unlist_copy(copy_item)
+            # borrowed by the member it was held for
+            if holder is not None:
+                self._drop_held_copy(holder, copy_item)
+            return
+
+        if holder is None:
+            holder = self._next_holder(copy_item.item.title)
+            if holder is not None:
+                copy_item.hold_for(holder)
+                self._held_copies.setdefault(holder.member_id, []).append(copy_item)
+                self._hold_notices.append((holder, copy_item))
+
+        if holder is None:
+            self._available_copies[copy_item.copy_id] = copy_item
+            self._available_ids.add(copy_item.copy_id)
+        else:
+            self._unlist_copy(copy_item)
+
+    def _unlist_copy(self, copy_item):
+        """Remove `copy_item` from `_available_copies` and its id index"""
+
+        if self._available_copies.pop(copy_item.copy_id, None) is not None:
+            self._available_ids.discard(copy_item.copy_id)
+
+    def _next_holder(self, title):
+        """Dequeue the first registered member waiting for `title`, in O(1)"""
+
+        queue = self._holds.get(title)
+        while queue:
+            try:
+                member = queue.popleft()
+            except IndexError:  # emptied by another thread
+                break
+            # members removed from the library since are skipped
+            if self._members.get(member.member_id) is member:
+                return member
+        return None
+
+    def _drop_held_copy(self, member, copy_item):
+        """Remove `copy_item` from the copies held for `member`"""
+
+        held_copies = self._held_copies.get(member.member_id, [])
+        if copy_item in held_copies:
+            held_copies.remove(copy_item)
+        if not held_copies:
+            self._held_copies.pop(member.member_id, None)
+
+    def _notify_holds(self):
+        """Notify hold listeners of the holds made since the last call"""
+
+        while self._hold_notices:
+            try:
+                member, copy_item = self._hold_notices.popleft()
+            except IndexError:  # drained by another thread
+                break
+            for listener in self._hold_listeners:
+                listener(member, copy_item)
+
+    def add_hold_listener(self, listener):
+        """Register a callable notified as `listener(member, item_copy)` when a
+        copy is held for a member that was waiting for it
+        """
+
+        self._hold_listeners.append(listener)
+
+    def place_hold(self, member, title):
+        """Queue `member` for the next copy of `title` to become available
+
+        Members are served first in, first out. A copy already available is
+        held for the member at once.
+
+        Returns:
+            position (int): 0 if a copy is now held for the member, else the
+                member's position in the queue for `title`.
+
+        Raises:
+            LibraryException: If the title or member does not exist, or the
+                member already waits for or holds a copy of the title.
+
+        """
+
+        if title not in self._items:
+            raise LibraryException(f"There is no item titled {title}")
+        if self._members.get(member.member_id) is not member:
+            raise LibraryException(f"Invalid member id {member.member_id}")
+        queue = self._holds.setdefault(title, deque())
+        if member in queue or any(
+            copy_item.item.title == title for copy_item in self.held_copies(member)
+        ):
+            raise LibraryException(f"{title} is already on hold for you")
+
+        queue.append(member)
+        # offer any copy that is available now, which goes to the queue's head
+        for copy_item in self._title_copies.get(title, []):
+            if copy_item.available and copy_item.reserved_for is None:
+                copy_item.offer()
+                break
+        self._notify_holds()
+
+        if member in queue:
+            return list(queue).index(member) + 1
+        return 0
+
+    def cancel_hold(self, member, title):
+        """Take `member` out of the queue for `title`, or give up the copy
+        held for them, which goes to the next member waiting.
+
+        Returns:
+            (bool): True if a hold was cancelled, False if there was none.
+
+        """
+
+        queue = self._holds.get(title)
+        if queue and member in queue:
+            queue.remove(member)
+            return True
+
+        for copy_item in self.held_copies(member):
+            if copy_item.item.title == title:
+                self._drop_held_copy(member, copy_item)
+                copy_item.offer()
+                self._notify_holds()
+                return True
+        return False
+
+    def held_copies(self, member):
+        """Retrieve the copies held for `member`, not yet borrowed"""
+
+        return list(self._held_copies.get(member.member_id, []))
+
+    def count_holds(self, title):
+        """Return the number of members waiting for `title`"""
+
+        return len(self._holds.get(title, ()))
 
     def register_member(self, member):
         """Add a member to `_members` if member id does not exist"""
 
         if member.member_id not in self._members:
             self._members[member.member_id] = member
+            for loan in member.present_loans():
+                self._due_dates.push(member, loan)
+            member.add_listener(self._loan_changed)
+            for listener in self._change_listeners:
+                listener(member, "register", None, None, 0.0)
             return True
         return False
 
     def remove_member(self, member_id):
         """Remove a member from `_members` based on the `member_id`"""
 
-        return self._members.pop(member_id, None)  # Return None if no member
+        member = self._members.pop(member_id, None)  # Return None if no member
+        if member is not None:
+            member.remove_listener(self._loan_changed)
+            # the member's unreturned loans are no longer the library's to chase
+            self._due_dates.drop(member)
+            # copies held for the member go to the next members waiting
+            for copy_item in self._held_copies.pop(member_id, []):
+                copy_item.offer()
+            self._notify_holds()
+            for listener in self._change_listeners:
+                listener(member, "remove", None, None, 0.0)
+        return member
+
+    def add_change_listener(self, listener):
+        """Register a callable notified of registered members' changes, as
+        `listener(member, event, loan, date, amount)`
+        """
+
+        self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener):
+        """Unregister a callable added with `add_change_listener`"""
+
+        self._change_listeners.remove(listener)
+
+    def _loan_changed(self, member, event, loan, date, amount):
+        """Listener keeping the due date index and holds in step with member
+        loans, and forwarding the change to the change listeners
+        """
+
+        if event in ("renew", "return"):
+            self._due_dates.discard()
+        if event in ("borrow", "renew"):
+            self._due_dates.push(member, loan)
+        # a returned copy may have been held for a member waiting for it
+        if event == "return":
+            self._notify_holds()
+        for listener in self._change_listeners:
+            listener(member, event, loan, date, amount)
+
+    def iter_loans(self):
+        """Yield (member, loan) for every loan of every registered member"""
+
+        for member in self._members.values():
+            for loan in member.loans():
+                yield member, loan
+
+    def overdue_loans(self, as_of):
+        """Retrieve the unreturned loans that are due before `as_of`
+
+        Returns:
+            overdue_loans (list): (member, loan) tuples sorted by due date.
+
+        """
+
+        return self._due_dates.overdue(as_of)
+
+    def reconciliation_report(self):
+        """Reconcile the ledger of every member in one pass over the members
+
+        Each member's ledger is totalled, and its fines are checked against
+        the fines of the member's returned loans, at the rate each loan was
+        charged when returned.
+
+        Returns:
+            report (dict): 'members', a list with one dict per member of
+                'member_id', 'fines', 'payments', 'balance', 'loan_fines' and
+                'reconciled'; and the 'fines', 'payments' and 'balance' totals
+                over all members and 'unreconciled', the ids of the members
+                whose ledger does not match their loans. Amounts are in cents.
+
+        """
+
+        report = {"members": [], "fines": 0, "payments": 0, "balance": 0}
+        unreconciled = []
+        for member in self._members.values():
+            fines, payments = member.ledger.totals()
+            balance = member.ledger.balance
+            loan_fines = sum(
+                to_cents(loan.get_fines()) for loan in member.past_loans()
+            )
+            reconciled = fines == loan_fines and balance == fines - payments
+            report["members"].append(
+                {
+                    "member_id": member.member_id,
+                    "fines": fines,
+                    "payments": payments,
+                    "balance": balance,
+                    "loan_fines": loan_fines,
+                    "reconciled": reconciled,
+                }
+            )
+            report["fines"] += fines
+            report["payments"] += payments
+            report["balance"] += balance
+            if not reconciled:
+                unreconciled.append(member.member_id)
+        report["unreconciled"] = unreconciled
+
+        return report
 
     def search_member(self, member_id):
         """Search a member based on `member_id` from `_members`"""
@@ -473,50 +1240,132 @@ class Library:
         """Search a copy item based on `copy_id` from `_copy_items`
 
         Returns:
-            matched[0] (ItemCopy): ItemCopy that matches provided `copy_id`
+            item_copy (ItemCopy): ItemCopy that matches provided `copy_id`,
+                False if no such copy exists.
         """
 
-        matched = [copy for copy in self._copy_items if copy.copy_id == copy_id]
-        # empty list -> False, list with element -> True
-        if matched:
-            return matched[0]
-        return False
+        return self._copy_index.get(copy_id, False)
+
+    def search_available_copy_item(self, copy_id):
+        """Search a currently available copy item based on `copy_id`
+
+        Returns:
+            item_copy (ItemCopy, None): The available ItemCopy that matches
+                provided `copy_id`, None if it does not exist or is on loan.
+        """
+
+        return self._available_copies.get(copy_id)
+
+    def count_available_copy_items(self):
+        """Return the number of item copies that are currently available"""
+
+        return len(self._available_copies)
 
     def get_available_copy_items(self):
         """Retrieving all item copies that are currently available
 
         Returns:
-            available_item_copies (list): A list of item copies that is available.
+            available_item_copies (list): A list of item copies that is available,
+                ordered by copy id.
 
         """
 
-        return [copy for copy in self._copy_items if copy.available is True]
+        return [self._copy_index[copy_id] for copy_id in self._available_ids]
+
+    def available_copy_page(self, after=0, page_size=20):
+        """Retrieve one page of the available item copies, ordered by copy id
+
+        The ids of the available copies are kept in order in
+        `_available_ids`, so the page start is found by bisection and only
+        the copies of the page are visited, however many copies are on loan
+        and in whatever order copies were added. Copies held for a member
+        are not available to others, and are left out. In debug mode,
+        `_available_copies` is checked against a scan of all copies.
+
+        Args:
+            after (int): Copy id after which the page starts, default to [0].
+            page_size (int): Largest number of copies returned, default to [20].
+
+        Returns:
+            available_item_copies (list): Up to `page_size` available copies
+                with a copy id greater than `after`.
+
+        """
+
+        if DEBUG:
+            self._check_available_copies()
+        return [
+            self._copy_index[copy_id]
+            for copy_id in self._available_ids.page(after, page_size)
+        ]
+
+    def _check_available_copies(self):
+        """Raise AssertionError if `_available_copies` or its id index
+        disagree with the copies that are available and not held for a member.
+        """
+
+        scanned = {
+            copy_item.copy_id
+            for copy_item in self._copy_items
+            if copy_item.available and copy_item.reserved_for is None
+        }
+        if scanned != self._available_copies.keys() or list(
+            self._available_ids
+        ) != sorted(scanned):
+            raise AssertionError(
+                f"Available copies {sorted(self._available_copies)} disagree "
+                f"with {sorted(scanned)} available and not held"
+            )
+
+    def iter_copy_item_lines(self, copy_item_list=None):
+        """Yield the string representation of item copies one line at a time,
+        default to all item copies of the Library.
+        """
+
+        copy_items = self._copy_items if copy_item_list is None else copy_item_list
+        return (str(copy) for copy in copy_items)
+
+    def iter_member_lines(self):
+        """Yield the string representation of members one line at a time"""
+
+        for member in self._members.values():
+            yield from member.iter_lines()
+
+    def iter_item_lines(self):
+        """Yield the string representation of items one line at a time"""
+
+        return (str(item) for item in self._items.values())
+
+    def iter_lines(self):
+        """Yield the string representation of the Library one line at a time,
+        without building it as a whole.
+        """
+
+        yield from self.iter_item_lines()
+        yield ""
+        yield from self.iter_copy_item_lines()
+        yield from self.iter_member_lines()
 
     def copy_item_str(self, copy_item_list=None):
         """String representation of item copies in the Library class object"""
 
-        if copy_item_list:
-            copy_items = "\n".join(str(copy) for copy in copy_item_list)
-        else:
-            copy_items = "\n".join(str(copy) for copy in self._copy_items)
-        return f"{copy_items}"
+        return "\n".join(self.iter_copy_item_lines(copy_item_list or None))
 
     def member_str(self):
         """String representation of members in the Library class object"""
 
-        members = "\n".join(str(mem) for mem in self._members.values())
-        return f"{members}"
+        return "\n".join(self.iter_member_lines())
 
     def item_str(self):
         """String representation of items in the Library class object"""
 
-        items = "\n".join(str(item) for item in self._items.values())
+        items = "\n".join(self.iter_item_lines())
         return f"{items}\n"
 
     def __str__(self):
         """String representation of a Library object"""
 
-        return f"{self.item_str()}" f"\n{self.copy_item_str()}" f"\n{self.member_str()}"
+        return "\n".join(self.iter_lines())
 
 
 # Q3(E)
@@ -527,21 +1376,90 @@ class LibraryApplication:
     renew and return the fines related to the items of the library. A Library
     object needs to used to initialise the library application.
 
+    Attributes:
+        PAGE_SIZE (int): Number of available copies listed per page when
+            borrowing, default to [20].
+
     Example:
         >>> LibraryMenu = Library(library: Library)
 
     """
 
-    def __init__(self, library):
-        """The `__init__` method initialises one instance attributes.
+    _PAGE_SIZE = 20
+
+    def __init__(self, library, store=None):
+        """The `__init__` method initialises two instance attributes.
 
         Args:
             library (Library): An initialised library to be used for the
                 Library application.
+            store (LibraryStore): Journal that successful operations are
+                recorded to, default to [None] for an in-memory library.
 
         """
 
         self._library = library
+        self._store = store
+        self._library.add_hold_listener(self._hold_made)
+
+    def _hold_made(self, member, item_copy):
+        """Hold listener announcing a copy held for a member that waited"""
+
+        print(
+            f"Copy id {item_copy.copy_id} {item_copy.item.title} "
+            f"is now held for {member.member_id}"
+        )
+
+    def _record(self, op, *args):
+        """Record a successful operation to the store, if any"""
+
+        if self._store is not None:
+            self._store.record(op, *args)
+
+    def title_check(self, prompt="Enter title: "):
+        """Obtain a title and match it against the library's titles
+
+        A title typed with different case, partially or with typing errors is
+        replaced by the single library title it matches, if any.
+
+        Args:
+            prompt (str): The prompt displayed for the title input.
+
+        Returns:
+            title (str): The matched library title, else the title as typed.
+
+        """
+
+        title = input(prompt).strip()
+        matched_title = self._library.resolve_title(title) if title else None
+        if matched_title is None or normalise(matched_title) == normalise(title):
+            return title
+
+        print(f"Using title: {matched_title}")
+        return matched_title
+
+    def hold_offer(self, member, title):
+        """Offer the member a hold on `title`, whose copies are unavailable
+
+        Args:
+            member (Member): The member the hold is placed for.
+            title (str): The title of the item to be held.
+
+        """
+
+        hold_choice = input(f"Place a hold on {title}? (y/n): ").strip()
+        if hold_choice.lower() != "y":
+            return
+
+        try:
+            position = self._library.place_hold(member, title)
+        except LibraryException as e:
+            print(e)
+            return
+        self._record("hold", member.member_id, title)
+        # a copy held at once is announced by `_hold_made`
+        if position:
+            print(f"Placed a hold on {title}, position {position} in the queue")
 
     @staticmethod
     def date_check(date_type):
@@ -612,36 +1530,69 @@ class LibraryApplication:
             )
             # Run validity check and print out statement for -> date used for borrowing
             borrow_date = self.date_check("borrow")
+            # Copy id after which the page of available items starts
+            page_after = 0
             # Executing the loop until the the member maxed out their quota
             while not member.quota_reached():
                 try:
-                    # Display all the available items in the library
-                    available_items = self._library.get_available_copy_items()
-                    available_items_ids = [avail.copy_id for avail in available_items]
+                    # Display one page of the available items in the library,
+                    # fetching one more to tell if there is a next page
+                    available_items = self._library.available_copy_page(
+                        page_after, self._PAGE_SIZE + 1
+                    )
+                    more_items = len(available_items) > self._PAGE_SIZE
+                    available_items = available_items[: self._PAGE_SIZE]
                     print("Available items")
-                    print(self._library.copy_item_str(available_items))
+                    for line in self._library.iter_copy_item_lines(available_items):
+                        print(line)
+                    if more_items:
+                        print("Enter + for more available items")
+                    # Copies held for the member are not listed as available
+                    held_items = self._library.held_copies(member)
+                    if held_items:
+                        print("Held for you")
+                        for line in self._library.iter_copy_item_lines(held_items):
+                            print(line)
 
                     # Get user option for items to borrow, else exit current menu option
                     copy_item_choice = input("Enter the copy id or 0 to end: ").strip()
                     # Break out of the loop if user choose to exit
                     if copy_item_choice == "0":
                         break
-                    # If user enters an invalid copy item id
-                    elif int(copy_item_choice) not in available_items_ids:
-                        print("Invalid copy id - does not match available items")
+                    # Move to the next page, or back to the first after the last
+                    elif copy_item_choice == "+":
+                        page_after = available_items[-1].copy_id if more_items else 0
                     else:
-                        item_copy = self._library.search_copy_item(
-                            int(copy_item_choice)
-                        )
+                        copy_id = int(copy_item_choice)
+                        item_copy = self._library.search_available_copy_item(copy_id)
+                        copy_item = self._library.search_copy_item(copy_id)
+                        # A copy held for the member is not listed as available
+                        if copy_item in held_items:
+                            item_copy = copy_item
+                        # If user enters an invalid copy item id
+                        if item_copy is None:
+                            print("Invalid copy id - does not match available items")
+                            # Offer a hold if the copy exists but is unavailable
+                            if copy_item:
+                                self.hold_offer(member, copy_item.item.title)
+                            continue
                         member.borrow_item(item_copy, borrow_date)
+                        self._record(
+                            "borrow", member.member_id, item_copy.copy_id, borrow_date
+                        )
                         print(f"Sucessfully borrowed {item_copy.item.title}")
                 # raise payment exceptions if business rules is violated regarding renewal
                 except LibraryPaymentException as pe:
                     payment_choice = input(pe).strip()
                     if payment_choice.lower() == "y":
                         # make the deduct from amount owed, assume full amount paid
-                        member.pay(member.amount_owed)
+                        amount_owed = member.amount_owed
+                        member.pay(amount_owed, borrow_date)
+                        self._record("pay", member.member_id, amount_owed, borrow_date)
                         member.borrow_item(item_copy, borrow_date)
+                        self._record(
+                            "borrow", member.member_id, item_copy.copy_id, borrow_date
+                        )
                         print(f"Sucessfully borrowed {item_copy.item.title}")
                     # break out of the loop if users decides not to pay (cannot borrow)
                     elif payment_choice.lower() == "n":
@@ -666,11 +1617,12 @@ class LibraryApplication:
         # If member exists
         if member:
             try:
-                title = input("Enter title: ").strip()
+                title = self.title_check()
                 # Run validity check and print out statement for -> date used for renewal
                 renew_date = self.date_check("renew")
                 # If title can be renewed return success message else raise appropriate exceptions
                 if member.renew(title, renew_date):
+                    self._record("renew", member.member_id, title, renew_date)
                     print(f"Successfully renewed {title.title()}")
             # raise exceptions if business rules is violated regarding renewal
             except LibraryException as e:
@@ -697,11 +1649,19 @@ class LibraryApplication:
             return_date = self.date_check("return")
             # Allow users to return all loans until no loans left or voluntary exit out of option
             while member.count_current_loan() > 0:
-                title = input("Enter title or <ENTER> to end: ").strip()
+                title = self.title_check("Enter title or <ENTER> to end: ")
                 # if title is enter instead of empty string ''
                 if title:
                     try:
+                        loan = member.search_loan_for(title)
                         member.return_item(title, return_date)
+                        self._record(
+                            "return",
+                            member.member_id,
+                            title,
+                            return_date,
+                            loan.fines_per_day,
+                        )
                         print(f"Successfully returned {title.title()}")
                     # raise exceptions if business rules is violated regarding returning
                     except LibraryException as e:
@@ -742,7 +1702,9 @@ class LibraryApplication:
                     else:
                         break
                 # Making the payment reflect for the member
-                change = member.pay(float(amount))
+                pay_date = clock.current().now()
+                change = member.pay(float(amount), pay_date)
+                self._record("pay", member.member_id, float(amount), pay_date)
                 print(
                     f"Sucessfully paid ${amount}. "
                     f"Current balance: ${member.amount_owed:.2f}"
@@ -759,6 +1721,9 @@ class LibraryApplication:
     # Print menu options
     def menu(self):
         """Menu to display the options available for the Library application"""
+        # Pick up changes to the loan policy file without a restart
+        policy.refresh()
+        clock.tick()
         print("Menu:")
         print("1. Borrow Item")
         print("2. Renew Item")
@@ -780,6 +1745,8 @@ class LibraryApplication:
                 self.option_4()
             elif int(selected_option) == 0:
                 print("Program ends")
+                if self._store is not None:
+                    self._store.close()
                 exit()
             else:
                 print("Invalid option")
@@ -921,6 +1888,13 @@ def initialise_library(members, items, item_copies, library):
     return library
 
 
+# Opt-in profiling of the public methods, reported on exit (see `profiling`)
+if os.environ.get("LIBRARY_PROFILE"):
+    from profiling import install
+
+    install(os.environ["LIBRARY_PROFILE"], LibraryApplication, Library, Member)
+
+
 def main():
     """Create, initialise and present menu for Library object using
     LibraryApplication menu
@@ -0,0 +1,306 @@
+"""
+Created on 18 Oct 2026
+
+Asyncio line-protocol server exposing a shared Library to many clients.
+
+Each request is one line, and each reply is one line:
+
+    BORROW <member_id> <copy_id> <dd/mm/yyyy>
+    RENEW <member_id> <dd/mm/yyyy> <title>
+    RETURN <member_id> <dd/mm/yyyy> <title>
+    PAY <member_id> <amount>
+    HOLD <member_id> <title>
+    QUIT
+
+Replies start with OK, ERROR (a LibraryException or malformed request) or
+PAYMENT <amount> (a LibraryPaymentException), followed by the message.
+
+Running the module with --load starts a load-generator client instead,
+which reports p50/p99 latency against a running server.
+
+"""
+
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from datetime import datetime
+
+import clock
+from q3 import (
+    Library,
+    LibraryException,
+    LibraryPaymentException,
+    initialise_library,
+    populated_items,
+)
+
+
+DATE_FORMAT = "%d/%m/%Y"
+
+
+class LibraryServer:
+    """A class to represent a line-protocol server for a Library.
+
+    All sessions share the library and run on one event loop, so requests
+    are applied one at a time without further locking.
+
+    Example:
+        >>> server = LibraryServer(library)
+        >>> asyncio.run(server.serve('127.0.0.1', 8162))
+
+    """
+
+    def __init__(self, library, store=None):
+        """The `__init__` method initialises three instance attributes.
+
+        Args:
+            library (Library): The library shared by all sessions.
+            store (LibraryStore): Journal that successful operations are
+                recorded to, default to [None].
+
+        """
+
+        self._library = library
+        self._store = store
+        # :int: Number of sessions currently connected
+        self._sessions = 0
+
+    @property
+    def sessions(self):
+        """The number of sessions currently connected"""
+
+        return self._sessions
+
+    def _member(self, member_id):
+        """Return the registered member, raising if the id is invalid"""
+
+        member = self._library.search_member(member_id.upper())
+        if member is None:
+            raise LibraryException("Invalid member id")
+        return member
+
+    def _record(self, op, *args):
+        """Record a successful operation to the store, if any"""
+
+        if self._store is not None:
+            self._store.record(op, *args)
+
+    def execute(self, line):
+        """Apply one request line to the library.
+
+        Returns:
+            reply (str): The reply line, without the newline.
+
+        """
+
+        command, _, arguments = line.strip().partition(" ")
+        command = command.upper()
+
+        try:
+            if command == "BORROW":
+                member_id, copy_id, date = arguments.split()
+                member = self._member(member_id)
+                item_copy = self._library.search_copy_item(int(copy_id))
+                if not item_copy:
+                    raise LibraryException(f"Invalid copy id {copy_id}")
+                borrow_date = datetime.strptime(date, DATE_FORMAT)
+                member.borrow_item(item_copy, borrow_date)
+                self._record("borrow", member.member_id, item_copy.copy_id, borrow_date)
+                return f"OK Sucessfully borrowed {item_copy.item.title}"
+
+            if command in ("RENEW", "RETURN"):
+                member_id, date, title = arguments.split(" ", 2)
+                member = self._member(member_id)
+                date = datetime.strptime(date, DATE_FORMAT)
+                if command == "RENEW":
+                    member.renew(title, date)
+                    self._record("renew", member.member_id, title, date)
+                    return f"OK Successfully renewed {title.title()}"
+                loan = member.search_loan_for(title)
+                member.return_item(title, date)
+                self._record("return", member.member_id, title, date, loan.fines_per_day)
+                return f"OK Successfully returned {title.title()}"
+
+            if command == "HOLD":
+                member_id, title = arguments.split(" ", 1)
+                member = self._member(member_id)
+                position = self._library.place_hold(member, title)
+                self._record("hold", member.member_id, title)
+                if position:
+                    return f"OK Placed a hold on {title}, position {position}"
+                return f"OK A copy of {title} is now held for you"
+
+            if command == "PAY":
+                member_id, amount = arguments.split()
+                member = self._member(member_id)
+                amount = float(amount)
+                # 'inf', 'nan' and out of range amounts such as 1e400
+                if not math.isfinite(amount):
+                    raise LibraryException(f"Invalid amount {amount}")
+                pay_date = clock.current().now()
+                change = member.pay(amount, pay_date)
+                self._record("pay", member.member_id, amount, pay_date)
+                return (
+                    f"OK Current balance: ${member.amount_owed:.2f} "
+                    f"Change: ${change:.2f}"
+                )
+
+            return f"ERROR Unknown command {command}"
+        # LibraryPaymentException must be caught before its LibraryException parent
+        except LibraryPaymentException as pe:
+            return f"PAYMENT {pe.amount:.2f} {pe}"
+        except LibraryException as e:
+            return f"ERROR {e}"
+        except ValueError:
+            return f"ERROR Malformed request: {line.strip()}"
+
+    async def handle_session(self, reader, writer):
+        """Serve requests from one connection until QUIT or disconnect"""
+
+        self._sessions += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line or line.strip().upper() == b"QUIT":
+                    break
+                clock.tick()
+                reply = self.execute(line.decode("utf-8", errors="replace"))
+                writer.write(reply.encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._sessions -= 1
+            writer.close()
+
+    async def serve(self, host, port):
+        """Accept sessions on `host`:`port` until cancelled"""
+
+        server = await asyncio.start_server(
+            self.handle_session, host, port, backlog=4096
+        )
+        async with server:
+            await server.serve_forever()
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at `fraction` (0 to 1) of a sorted list"""
+
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def _load_session(host, port, requests, member_ids, copy_ids, latencies):
+    """Send `requests` random requests over one connection"""
+
+    reader, writer = await asyncio.open_connection(host, port)
+    for _ in range(requests):
+        member_id = random.choice(member_ids)
+        kind = random.random()
+        if kind < 0.4:
+            line = f"BORROW {member_id} {random.choice(copy_ids)} 01/04/2021"
+        elif kind < 0.7:
+            line = f"RETURN {member_id} 10/04/2021 Dark Knight"
+        elif kind < 0.9:
+            line = f"RENEW {member_id} 05/04/2021 Dark Knight"
+        else:
+            line = f"PAY {member_id} 1"
+
+        start = time.perf_counter()
+        writer.write(line.encode("utf-8") + b"\n")
+        await writer.drain()
+        await reader.readline()
+        latencies.append(time.perf_counter() - start)
+
+    writer.write(b"QUIT\n")
+    await writer.drain()
+    writer.close()
+
+
+async def run_load(host, port, sessions, requests, member_ids, copy_ids):
+    """Run concurrent client sessions against a server and report latency.
+
+    Returns:
+        report (dict): Number of requests, requests per second, and p50 and
+            p99 latency in milliseconds.
+
+    """
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _load_session(host, port, requests, member_ids, copy_ids, latencies)
+            for _ in range(sessions)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    """Start the server, or the load-generator client with --load"""
+
+    parser = argparse.ArgumentParser(description="Library line-protocol server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8162)
+    parser.add_argument("--store", help="directory to persist the library in")
+    parser.add_argument("--load", action="store_true", help="run the load client")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--members", default="S123,J111")
+    parser.add_argument("--copies", type=int, default=9)
+    args = parser.parse_args()
+
+    if args.load:
+        report = asyncio.run(
+            run_load(
+                args.host,
+                args.port,
+                args.sessions,
+                args.requests,
+                args.members.split(","),
+                list(range(1, args.copies + 1)),
+            )
+        )
+        print(
+            f"{report['requests']} requests "
+            f"({report['requests_per_second']:.0f} req/sec) "
+            f"p50: {report['p50_ms']:.2f}ms p99: {report['p99_ms']:.2f}ms"
+        )
+        return
+
+    def initialise():
+        return initialise_library(*populated_items(), Library())
+
+    store = None
+    if args.store:
+        from persistence import LibraryStore
+
+        store = LibraryStore(args.store)
+        library = store.open(initialise)
+    else:
+        library = initialise()
+
+    print(f"Serving on {args.host}:{args.port}")
+    try:
+        asyncio.run(LibraryServer(library, store).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if store is not None:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
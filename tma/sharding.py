@@ -0,0 +1,564 @@
+"""
+Created on 18 Oct 2026
+
+A library sharded by member across worker processes.
+
+Members are partitioned by the CRC-32 of their member id, so a member always
+lands on the same worker whatever the process (unlike `hash`, which is
+salted per process). Each worker holds a replica of the catalogue, with the
+same copy ids, and the members of its shard, and applies their borrows,
+renewals, returns and payments with the q3 `Member` logic.
+
+Copy availability is owned by the coordinator, `ShardedLibrary`: a borrow
+claims the copy in the coordinator before it is dispatched, so no two
+shards can lend the same copy, and the copy is released when the borrow
+fails or the loan is returned. Requests are dispatched in chunks, one
+message per worker per chunk, and the workers apply their chunks in
+parallel. The dispatch is pipelined: the coordinator sends the next chunk
+before it collects the replies to the previous one, so the workers are
+applying a chunk while the coordinator routes the next. The routing and
+reply handling in the coordinator stay serial, and bound the speedup.
+
+Running the module times the same workload against the unsharded library,
+`LocalLibrary`, and against 1, 2, 4 and 8 workers:
+
+    python sharding.py --ops 200000 --workers 1,2,4,8
+
+"""
+
+
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+
+from q2 import Book, Media
+from q3 import JuniorMember, Library, LibraryException, Member
+
+
+# Seconds between checks that a worker is alive while waiting for its replies
+LIVENESS_INTERVAL = 1.0
+
+BORROW = "borrow"
+RENEW = "renew"
+RETURN = "return"
+PAY = "pay"
+
+
+def shard_for(member_id, shards):
+    """Return the shard, from 0 to `shards` - 1, owning `member_id`"""
+
+    return zlib.crc32(member_id.encode("utf-8")) % shards
+
+
+def _apply(library, request):
+    """Apply one request to the library of a worker.
+
+    Returns:
+        reply (tuple): (True, result) where result is the copy id borrowed
+            or returned, True for a renewal, or the change of a payment, or
+            (False, message) if the member cannot make the request or the
+            request is malformed.
+
+    """
+
+    op, member_id, argument, date = request
+    member = library.search_member(member_id)
+    if member is None:
+        return False, f"No member with id {member_id}"
+    try:
+        if op == BORROW:
+            item_copy = library.search_copy_item(argument)
+            if not item_copy:
+                return False, f"No copy with id {argument}"
+            member.borrow_item(item_copy, date)
+            return True, argument
+        if op == RETURN:
+            loan = member.search_loan_for(argument)
+            member.return_item(argument, date)
+            return True, loan.copy_id()
+        if op == RENEW:
+            return True, member.renew(argument, date)
+        if op == PAY:
+            return True, member.pay(argument, date)
+    except Exception as e:
+        # any failure is the request's reply, a worker that died would leave
+        # the coordinator waiting for replies that never come
+        return False, str(e)
+    return False, f"Unknown operation {op}"
+
+
+def _receive(connection, batches):
+    """Worker thread: queue each batch received, until None is received"""
+
+    while True:
+        batch = connection.recv()
+        batches.put(batch)
+        if batch is None:
+            break
+
+
+def _build_library(items, copies, members):
+    """Return a Library of `items`, with the (copy id, title) `copies`, and
+    `members` registered
+    """
+
+    library = Library()
+    for item in items:
+        library.add_item(item)
+    for copy_id, title in copies:
+        library.add_copy_item(library.search_item(title), copy_id)
+    for member in members:
+        library.register_member(member)
+    return library
+
+
+def _serve(connection, items, copies, members):
+    """Worker process: build the shard's library, then apply each batch
+    received and send back its replies, until None is received.
+    """
+
+    library = _build_library(items, copies, members)
+    connection.send(len(members))  # ready
+
+    # batches are received on their own thread, so the coordinator sending
+    # the next batch never waits on this one's replies being read
+    batches = queue.SimpleQueue()
+    receiver = threading.Thread(target=_receive, args=(connection, batches), daemon=True)
+    receiver.start()
+    while True:
+        batch = batches.get()
+        if batch is None:
+            break
+        connection.send([_apply(library, request) for request in batch])
+    receiver.join()
+    connection.close()
+
+
+class ShardedLibrary:
+    """A class to represent a library whose members are sharded across
+    worker processes.
+
+    Requests are (op, member_id, argument, date) tuples, where op is
+    `BORROW` with a copy id, `RENEW` or `RETURN` with a title, or `PAY` with
+    an amount.
+
+    A copy returned becomes available to the borrows of the chunks routed
+    after the coordinator has collected the return's reply, that is from
+    the second chunk following the return's.
+
+    Example:
+        >>> with ShardedLibrary(items, titles, members, workers=4) as library:
+        ...     library.submit([(BORROW, 'S123', 1, datetime(2021, 3, 1))])
+        [(True, 1)]
+
+    """
+
+    def __init__(self, items, copy_titles, members, workers=4, chunk_size=256):
+        """The `__init__` method initialises seven instance attributes, and
+        starts the worker processes, returning once they are ready.
+
+        Args:
+            items (list): Items of the catalogue.
+            copy_titles (list): Title of each copy, the copies being given
+                ids from 1 in this order.
+            members (list): Members of the library, without loans.
+            workers (int): Number of worker processes, default to [4].
+            chunk_size (int): Number of requests of a batch routed and
+                dispatched together, default to [256].
+
+        """
+
+        # :dict: title of each copy, with key as copy id
+        self._copy_titles = dict(enumerate(copy_titles, start=1))
+        # :set: copy ids that are neither lent nor claimed by a pending borrow
+        self._available = set(self._copy_titles)
+        # :dict: member id of the borrower of each lent copy, with key as copy id
+        self._lent = {}
+        # :list: Connection to each worker, indexed by shard
+        self._connections = []
+        # :list: Process of each worker, indexed by shard
+        self._processes = []
+        self._workers = workers
+        self._chunk_size = chunk_size
+
+        shard_members = [[] for _ in range(workers)]
+        for member in members:
+            shard_members[shard_for(member.member_id, workers)].append(member)
+        copies = list(self._copy_titles.items())
+
+        for shard in range(workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_serve,
+                args=(worker_connection, items, copies, shard_members[shard]),
+                daemon=True,
+            )
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+        # the workers build their libraries in parallel, wait for all of them
+        for shard in range(workers):
+            self._receive(shard)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def workers(self):
+        """Number of worker processes.
+
+        :getter: Return the number of shards
+        :rtype: int
+
+        """
+
+        return self._workers
+
+    def _receive(self, shard):
+        """Receive the next message of worker `shard`.
+
+        Raises:
+            LibraryException: If the worker has exited, or exits before
+                sending the message.
+
+        """
+
+        connection = self._connections[shard]
+        process = self._processes[shard]
+        try:
+            while not connection.poll(LIVENESS_INTERVAL):
+                if not process.is_alive():
+                    break
+            else:
+                return connection.recv()
+        except (EOFError, OSError):
+            pass
+        process.join(LIVENESS_INTERVAL)
+        raise LibraryException(f"Worker {shard} exited with code {process.exitcode}")
+
+    def shard_of(self, member_id):
+        """Return the shard owning `member_id`"""
+
+        return shard_for(member_id, self._workers)
+
+    def count_available_copy_items(self):
+        """Return the number of copies neither lent nor claimed"""
+
+        return len(self._available)
+
+    def copy_title(self, copy_id):
+        """Return the title of copy `copy_id`"""
+
+        return self._copy_titles[copy_id]
+
+    def borrower_of(self, copy_id):
+        """Return the member id of the borrower of `copy_id`, None if the copy
+        is not lent.
+        """
+
+        return self._lent.get(copy_id)
+
+    def submit(self, requests):
+        """Dispatch a batch of requests to the workers owning their members.
+
+        Borrows of copies that are unavailable are refused without being
+        dispatched. The batch is dispatched in chunks of `chunk_size`, the
+        next chunk being sent before the replies to the previous one are
+        collected. The workers apply their share of each chunk in parallel,
+        each in request order.
+
+        Returns:
+            replies (list): The reply to each request, in request order, as
+                (True, result) or (False, message).
+
+        """
+
+        replies = [None] * len(requests)
+        in_flight = deque()
+        for start in range(0, len(requests), self._chunk_size):
+            in_flight.append(self._dispatch(requests, start, replies))
+            if len(in_flight) > 1:
+                self._collect(*in_flight.popleft(), replies)
+        while in_flight:
+            self._collect(*in_flight.popleft(), replies)
+
+        return replies
+
+    def _dispatch(self, requests, start, replies):
+        """Route the chunk of `requests` from `start` and send it to the
+        workers, refusing borrows of unavailable copies in `replies`.
+
+        Returns:
+            (tuple): The requests sent to each worker, and their indexes in
+                `requests`.
+
+        """
+
+        batches = [[] for _ in range(self._workers)]
+        positions = [[] for _ in range(self._workers)]
+
+        for index in range(start, min(len(requests), start + self._chunk_size)):
+            request = requests[index]
+            op, member_id, argument, _ = request
+            if op == BORROW:
+                if argument not in self._available:
+                    if argument in self._copy_titles:
+                        replies[index] = (False, f"Unavailable: copy {argument}")
+                    else:
+                        replies[index] = (False, f"No copy with id {argument}")
+                    continue
+                # claimed until the worker replies
+                self._available.discard(argument)
+            shard = shard_for(member_id, self._workers)
+            batches[shard].append(request)
+            positions[shard].append(index)
+
+        for connection, batch in zip(self._connections, batches):
+            if batch:
+                connection.send(batch)
+        return batches, positions
+
+    def _collect(self, batches, positions, replies):
+        """Receive the replies to a dispatched chunk into `replies`, and
+        record the copies lent, or released by failed borrows and returns.
+        """
+
+        for shard, (batch, indexes) in enumerate(zip(batches, positions)):
+            if not batch:
+                continue
+            for index, request, reply in zip(indexes, batch, self._receive(shard)):
+                replies[index] = reply
+                op, member_id, argument, _ = request
+                if op == BORROW:
+                    if reply[0]:
+                        self._lent[argument] = member_id
+                    else:
+                        self._available.add(argument)
+                elif op == RETURN and reply[0]:
+                    del self._lent[reply[1]]
+                    self._available.add(reply[1])
+
+    def _submit_one(self, request):
+        """Dispatch a single request, raising LibraryException if refused"""
+
+        succeeded, result = self.submit([request])[0]
+        if not succeeded:
+            raise LibraryException(result)
+        return result
+
+    def borrow_item(self, member_id, copy_id, date_borrowed):
+        """Lend copy `copy_id` to the member, returning the copy id"""
+
+        return self._submit_one((BORROW, member_id, copy_id, date_borrowed))
+
+    def renew(self, member_id, title, renew_date):
+        """Renew the member's loan of `title`"""
+
+        return self._submit_one((RENEW, member_id, title, renew_date))
+
+    def return_item(self, member_id, title, return_date):
+        """Return the member's loan of `title`, returning the copy id"""
+
+        return self._submit_one((RETURN, member_id, title, return_date))
+
+    def pay(self, member_id, amount, date):
+        """Pay the member's fines, returning the change"""
+
+        return self._submit_one((PAY, member_id, amount, date))
+
+    def close(self):
+        """Stop the worker processes"""
+
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                pass  # the worker has already exited
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections.clear()
+        self._processes.clear()
+
+
+class LocalLibrary:
+    """A class to represent an unsharded library, applying requests in
+    process with the same interface as ShardedLibrary, as the baseline of
+    its throughput.
+
+    Example:
+        >>> with LocalLibrary(items, titles, members) as library:
+        ...     library.submit([(BORROW, 'S123', 1, datetime(2021, 3, 1))])
+        [(True, 1)]
+
+    """
+
+    def __init__(self, items, copy_titles, members):
+        """The `__init__` method initialises two instance attributes.
+
+        Args:
+            items (list): Items of the catalogue.
+            copy_titles (list): Title of each copy, the copies being given
+                ids from 1 in this order.
+            members (list): Members of the library, without loans.
+
+        """
+
+        # :dict: title of each copy, with key as copy id
+        self._copy_titles = dict(enumerate(copy_titles, start=1))
+        self._library = _build_library(items, self._copy_titles.items(), members)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def copy_title(self, copy_id):
+        """Return the title of copy `copy_id`"""
+
+        return self._copy_titles[copy_id]
+
+    def submit(self, requests):
+        """Apply a batch of requests in order.
+
+        Returns:
+            replies (list): The reply to each request, in request order, as
+                (True, result) or (False, message).
+
+        """
+
+        return [_apply(self._library, request) for request in requests]
+
+
+def synthetic_library(items, copies, members, seed=162):
+    """Generate the catalogue and members of a synthetic sharded library.
+
+    Returns:
+        item_list (list): Items, half books and half media.
+        copy_titles (list): Title of each copy, spread evenly over the items.
+        member_list (list): Members, one in ten a junior member.
+
+    """
+
+    rng = random.Random(seed)
+    item_list = []
+    for index in range(items):
+        year = rng.randint(2000, 2021)
+        cost = rng.randint(10, 60)
+        if index % 2:
+            item_list.append(Book(f"Book {index}", year, cost, [f"Author {index}"]))
+        else:
+            item_list.append(Media(f"Media {index}", year, cost))
+
+    copy_titles = [item_list[index % items].title for index in range(copies)]
+    member_list = [
+        (JuniorMember if index % 10 == 0 else Member)(f"M{index}", f"Member {index}")
+        for index in range(members)
+    ]
+    return item_list, copy_titles, member_list
+
+
+def run_workload(library, member_ids, copies, ops, batch_size, seed=162, days=365):
+    """Drive a random mix of borrows, renewals, returns and payments against a
+    ShardedLibrary or LocalLibrary in batches of `batch_size`.
+
+    Renewals and returns are of loans made by earlier batches.
+
+    Returns:
+        (tuple): Seconds spent in `submit`, and the number of requests that
+            succeeded.
+
+    """
+
+    rng = random.Random(seed)
+    start_date = datetime(2021, 1, 1)
+    open_loans = []  # (member id, title) of loans made
+    elapsed = 0.0
+    succeeded = 0
+
+    for batch_start in range(0, ops, batch_size):
+        batch = []
+        for index in range(batch_start, min(ops, batch_start + batch_size)):
+            date = start_date + timedelta(days=days * index / ops)
+            draw = rng.random()
+            if draw < 0.5 or not open_loans:
+                copy_id = rng.randint(1, copies)
+                batch.append((BORROW, rng.choice(member_ids), copy_id, date))
+            elif draw < 0.65:
+                member_id, title = open_loans[rng.randrange(len(open_loans))]
+                batch.append((RENEW, member_id, title, date))
+            elif draw < 0.9:
+                position = rng.randrange(len(open_loans))
+                open_loans[position], open_loans[-1] = open_loans[-1], open_loans[position]
+                member_id, title = open_loans.pop()
+                batch.append((RETURN, member_id, title, date))
+            else:
+                batch.append((PAY, rng.choice(member_ids), 5.00, date))
+
+        start = time.perf_counter()
+        replies = library.submit(batch)
+        elapsed += time.perf_counter() - start
+
+        for request, (ok, result) in zip(batch, replies):
+            succeeded += ok
+            if ok and request[0] == BORROW:
+                open_loans.append((request[1], library.copy_title(result)))
+
+    return elapsed, succeeded
+
+
+def main():
+    """Time the same workload against the unsharded library and increasing
+    numbers of workers
+    """
+
+    parser = argparse.ArgumentParser(description="Sharded library scaling")
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--copies", type=int, default=50000)
+    parser.add_argument("--members", type=int, default=20000)
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--chunk", type=int, default=256)
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'ops/sec':>12}{'speedup':>10}{'succeeded':>11}")
+
+    # the unsharded library mutates its members, so each run has fresh ones
+    libraries = [("local", LocalLibrary, ())] + [
+        (workers, ShardedLibrary, (workers, args.chunk))
+        for workers in (int(count) for count in args.workers.split(","))
+    ]
+    baseline = None
+    for label, library_class, options in libraries:
+        items, copy_titles, members = synthetic_library(
+            args.items, args.copies, args.members
+        )
+        member_ids = [member.member_id for member in members]
+        with library_class(items, copy_titles, members, *options) as library:
+            elapsed, succeeded = run_workload(
+                library, member_ids, args.copies, args.ops, args.batch
+            )
+        throughput = args.ops / elapsed
+        baseline = baseline or throughput
+        print(
+            f"{label:>8}{throughput:>12.0f}{throughput / baseline:>10.2f}"
+            f"{succeeded:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
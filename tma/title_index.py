@@ -0,0 +1,282 @@
+"""
+Created on 18 Oct 2026
+
+Case-insensitive prefix and typo-tolerant lookup of item titles.
+
+Titles are normalised (case-folded, whitespace collapsed) and kept in a
+sorted list for prefix lookup by bisection. For fuzzy lookup, every
+distinct word of the titles is indexed under its deletion variants (the
+word with up to `max_distance` characters deleted), so that the words close
+to a typed word are found with a few dictionary lookups.
+
+"""
+
+
+from bisect import bisect_left
+from itertools import combinations
+
+
+def normalise(title):
+    """Return the normalised form of a title used as index key"""
+
+    return " ".join(title.casefold().split())
+
+
+def deletion_variants(word, max_distance):
+    """Return the strings obtained by deleting up to `max_distance`
+    characters from `word`, including `word` itself.
+    """
+
+    variants = {word}
+    for count in range(1, min(max_distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), count):
+            variants.add(
+                "".join(char for index, char in enumerate(word) if index not in positions)
+            )
+    return variants
+
+
+def word_tolerance(word, max_distance):
+    """Return the typing errors tolerated in one word: none for words of up to
+    two characters, one for up to five characters, else `max_distance`.
+
+    Short words are within a couple of edits of most other short words, so
+    tolerating more would match almost the whole vocabulary.
+
+    """
+
+    if len(word) <= 2:
+        return 0
+    if len(word) <= 5:
+        return min(1, max_distance)
+    return max_distance
+
+
+def edit_distance(first, second, limit):
+    """Return the Levenshtein distance of two strings, or `limit` + 1 if the
+    distance exceeds `limit`.
+
+    Only the diagonal band of width `2 * limit + 1` of the distance matrix
+    is computed, and computation stops early once every cell in a row of
+    the band exceeds `limit`.
+
+    """
+
+    beyond = limit + 1
+    if abs(len(first) - len(second)) > limit:
+        return beyond
+    if first == second:
+        return 0
+
+    width = len(second)
+    previous = [min(column, beyond) for column in range(width + 1)]
+    for row, first_char in enumerate(first, start=1):
+        current = [beyond] * (width + 1)
+        current[0] = best = min(row, beyond)
+        for column in range(max(1, row - limit), min(width, row + limit) + 1):
+            cost = previous[column - 1] + (first_char != second[column - 1])
+            if previous[column] + 1 < cost:
+                cost = previous[column] + 1
+            if current[column - 1] + 1 < cost:
+                cost = current[column - 1] + 1
+            current[column] = cost if cost < beyond else beyond
+            if cost < best:
+                best = cost
+        if best > limit:
+            return beyond
+        previous = current
+
+    return previous[width]
+
+
+class TitleIndex:
+    """A class to represent an index of titles for prefix and fuzzy lookup.
+
+    Example:
+        >>> index = TitleIndex()
+        >>> index.add('Dark Knight')
+        >>> index.prefix('dark')
+        ['Dark Knight']
+        >>> index.fuzzy('dark knigt')
+        ['Dark Knight']
+
+    """
+
+    def __init__(self, max_distance=2):
+        """The `__init__` method initialises six instance attributes.
+
+        Args:
+            max_distance (int): The largest number of typing errors that
+                fuzzy lookups can tolerate, default to [2].
+
+        """
+
+        self._max_distance = max_distance
+        # :dict: original titles, with key as the normalised title
+        self._titles = {}
+        # :list: sorted normalised titles, for prefix lookup
+        self._sorted_keys = []
+        # :list: normalised titles added since `_sorted_keys` was last sorted
+        self._pending_keys = []
+        # :dict: normalised titles containing each word
+        self._word_titles = {}
+        # :dict: words of the titles, with key as each of their deletion variants
+        self._variant_words = {}
+
+    def __len__(self):
+        """Return the number of distinct normalised titles"""
+
+        return len(self._titles)
+
+    def add(self, title):
+        """Index a title, in amortised O(1) time per title"""
+
+        key = normalise(title)
+        titles = self._titles.get(key)
+        if titles is not None:
+            if title not in titles:
+                titles.append(title)
+            return
+
+        self._titles[key] = [title]
+        # Sorted lazily, so that bulk loading does not insert one by one
+        self._pending_keys.append(key)
+        for word in set(key.split()):
+            word_titles = self._word_titles.get(word)
+            if word_titles is None:
+                word_titles = self._word_titles[word] = []
+                for variant in deletion_variants(word, self._max_distance):
+                    self._variant_words.setdefault(variant, []).append(word)
+            word_titles.append(key)
+
+    def exact(self, title):
+        """Return the indexed titles that normalise the same as `title`"""
+
+        return list(self._titles.get(normalise(title), []))
+
+    def _keys(self):
+        """Return the sorted normalised titles, merging any pending ones"""
+
+        if self._pending_keys:
+            self._sorted_keys.extend(self._pending_keys)
+            self._sorted_keys.sort()
+            self._pending_keys = []
+        return self._sorted_keys
+
+    def prefix(self, prefix, limit=10):
+        """Return up to `limit` titles starting with `prefix`, ignoring case.
+
+        Runs in O(log n + limit) once pending titles have been merged.
+
+        """
+
+        keys = self._keys()
+        prefix = normalise(prefix)
+        found = []
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and len(found) < limit:
+            key = keys[position]
+            if not key.startswith(prefix):
+                break
+            found.extend(self._titles[key])
+            position += 1
+
+        return found[:limit]
+
+    def _close_words(self, word, max_distance):
+        """Return the indexed words sharing a deletion variant with `word`.
+
+        This includes every word within `max_distance` edits of `word`, and
+        some that are further (up to `2 * max_distance`). They are not
+        filtered here, as candidate titles are checked against the whole
+        query anyway.
+
+        """
+
+        candidates = set()
+        for variant in deletion_variants(word, max_distance):
+            candidates.update(self._variant_words.get(variant, ()))
+        return candidates
+
+    def fuzzy(self, query, max_distance=2, limit=10):
+        """Return up to `limit` titles within `max_distance` edits of `query`,
+        closest first.
+
+        Every word of the query is matched to the indexed words within its
+        `word_tolerance` of edits. Candidate titles are read from the posting
+        lists of the query word with the fewest matching titles, filtered on
+        length and on containing a match for every other query word, and
+        then checked against the whole query. Typing errors that join or
+        split words are not tolerated.
+
+        """
+
+        max_distance = min(max_distance, self._max_distance)
+        key = normalise(query)
+        words = key.split()
+        if not words:
+            return []
+
+        matches = [
+            self._close_words(word, word_tolerance(word, max_distance))
+            for word in words
+        ]
+        sizes = [
+            sum(len(self._word_titles[word]) for word in matched) for matched in matches
+        ]
+        smallest = sizes.index(min(sizes))
+        others = matches[:smallest] + matches[smallest + 1 :]
+
+        scored = []
+        seen = set()
+        for word in matches[smallest]:
+            for candidate in self._word_titles[word]:
+                if candidate in seen or abs(len(candidate) - len(key)) > max_distance:
+                    continue
+                seen.add(candidate)
+                candidate_words = candidate.split()
+                if not all(
+                    any(candidate_word in matched for candidate_word in candidate_words)
+                    for matched in others
+                ):
+                    continue
+                distance = edit_distance(key, candidate, max_distance)
+                if distance <= max_distance:
+                    scored.append((distance, candidate))
+        scored.sort()
+
+        found = []
+        for _, candidate in scored:
+            found.extend(self._titles[candidate])
+        return found[:limit]
+
+    def resolve(self, title, max_distance=2):
+        """Return the single indexed title that `title` most likely refers to.
+
+        An exact (case-insensitive) match is preferred, then a unique prefix
+        match, then a unique closest fuzzy match.
+
+        Returns:
+            title (str, None): The indexed title, None if there is no single
+                best match.
+
+        """
+
+        for candidates in (self.exact(title), self.prefix(title, limit=2)):
+            if len(candidates) == 1:
+                return candidates[0]
+            if candidates:
+                return None
+
+        key = normalise(title)
+        candidates = self.fuzzy(title, max_distance, limit=2)
+        if len(candidates) == 1:
+            return candidates[0]
+        if len(candidates) == 2:
+            first, second = (
+                edit_distance(key, normalise(candidate), max_distance)
+                for candidate in candidates
+            )
+            if first < second:
+                return candidates[0]
+        return None